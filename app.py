@@ -1,239 +1,713 @@
 #! /usr/bin/env python3
 
 import click
-import gitlab
 import csv
 import json
 import logging
 import os
 import configparser
 from collections import defaultdict
-import pdb
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache, partial
+from itertools import islice
 import re
-import pandas as pd
+import time
+from issue_store import IssueStore
+from issue_record import ISSUE_FIELDNAMES, IssueRecord, records_from_page
+from group_lookup import GroupLookup
+from workers import RateLimiter, merge_streams, run_ordered
+from time_ledger import TimeLedger
+from profiling import profiler
 
-# Load configuration from config file
-config = configparser.ConfigParser()
-config.read(os.path.join(os.path.dirname(__file__), 'config.ini'))
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    handlers=[logging.FileHandler("gitlab_assistant.log"), logging.StreamHandler()])
+# python-gitlab, requests, pandas and matplotlib are imported where they are used
+# so that --help and cron runs of the lighter commands start quickly
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def load_config():
+    """Read config.ini, or the file named by GITLAB_ASSISTANT_CONFIG, on first use."""
+    config = configparser.ConfigParser()
+    config.read(os.environ.get('GITLAB_ASSISTANT_CONFIG', os.path.join(os.path.dirname(__file__), 'config.ini')))
+    return config
+
+
+def setup_logging():
+    # delay=True creates the log file on the first record, so --help leaves none behind
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler("gitlab_assistant.log", delay=True), logging.StreamHandler()])
+
+
 def load_project_config(project_name):
+    config = load_config()
     if project_name not in config:
         raise ValueError(f"Project {project_name} not found in configuration.")
     project_config = config[project_name]
     return project_config['url'], project_config['project_id'], project_config['group_id'], project_config['access_token']
 
 
+@lru_cache(maxsize=None)
+def gitlab_client(project_name):
+    """Return the shared GitLab client of a project.
+
+    The client runs on a pooled keep-alive session that asks for gzip and retries
+    idempotent requests on 5xx errors. Setting ``http_cache_dir`` in the project
+    section caches read-only metadata with ETags (``http_cache_fresh_for`` seconds
+    are served without revalidating); ``http_pool_size`` sizes the pool.
+    """
+    import gitlab
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    from http_cache import ETagCacheAdapter
+
+    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+    project_config = load_config()[project_name]
+    pool_size = project_config.getint('http_pool_size', 32)
+
+    # GitLab's own 429 handling is left to python-gitlab
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False)
+    adapter_options = {'pool_connections': pool_size, 'pool_maxsize': pool_size, 'max_retries': retry}
+    if project_config.get('http_cache_dir'):
+        adapter = ETagCacheAdapter(project_config['http_cache_dir'],
+                                   fresh_for=project_config.getint('http_cache_fresh_for', 0), **adapter_options)
+    else:
+        adapter = HTTPAdapter(**adapter_options)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+    profiler.install(session)
+    return gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN, session=session)
+
+
+def resolve_project_names(project_names, all_projects):
+    """Return the projects selected by --project_name (repeatable) or --all-projects."""
+    if all_projects:
+        return load_config().sections()
+    if not project_names:
+        raise click.UsageError('Pass --project_name or --all-projects.')
+    return list(project_names)
+
+
+def run_per_project(func, project_names, workers):
+    """Run ``func(project_name)`` for several projects in parallel, isolating failures.
+
+    Failures are reported per project in the given order; a ClickException is
+    raised at the end if any project failed.
+    """
+    def run(project_name):
+        try:
+            func(project_name)
+        except Exception as e:
+            logger.exception(f"Project {project_name} failed")
+            return e
+        return None
+
+    failed = 0
+    for project_name, error in zip(project_names, run_ordered(run, project_names, workers)):
+        if error is not None:
+            click.echo(f'Project {project_name} failed - {error}')
+            failed += 1
+    if failed:
+        raise click.ClickException(f'{failed} of {len(project_names)} projects failed.')
+
+
 @click.group()
-def cli():
+@click.option('--profile', is_flag=True, help='Print API calls, bytes and per-endpoint and per-phase timings as JSON at exit.')
+@click.option('--profile-output', default=None, help='Write the --profile report to this JSON file instead.')
+@click.pass_context
+def cli(ctx, profile, profile_output):
     """Command line tool for managing GitLab issues."""
-    pass
-
-def issues_to_dataframe(issues):
-    """Convert a list of issues to a pandas DataFrame."""
-    # data = []
-    # for issue in issues:
-    #     data.append({
-    #         'id': issue.id,
-    #         'iid': issue.iid,
-    #         'title': issue.title,
-    #         'epic': issue.epic["title"] if issue.epic else '',
-    #         'milestone': issue.milestone["title"] if issue.milestone else '',
-    #         'iteration': issue.iteration['start_date'] if issue.attributes['iteration'] is not None else '',
-    #         'labels': ', '.join(issue.labels),
-    #         'author': issue.author['name'],
-    #         'created_at': issue.created_at,
-    #         'description': issue.description,
-    #         'state': issue.state,
-    #         'weight': issue.weight if 'weight' in issue.attributes else ''
-    #     })
-    return pd.DataFrame(issues)
+    setup_logging()
+    if profile or profile_output:
+        profiler.enable()
+
+        def emit_profile():
+            report = dict(command=ctx.invoked_subcommand, **profiler.report())
+            if profile_output:
+                with open(profile_output, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+            else:
+                click.echo(json.dumps(report, indent=2), err=True)
+
+        ctx.call_on_close(emit_profile)
+
+def typed_issue_frame(frame):
+    """Give a frame of issue rows proper column types.
+
+    Timestamps become datetime64, state/milestone/epic/iteration categoricals
+    (missing values as NA, not ''), weight a nullable integer and labels a list
+    per issue.
+    """
+    import pandas as pd
+
+    frame = frame.copy()
+    frame['id'] = frame['id'].astype('int64')
+    frame['iid'] = frame['iid'].astype('int64')
+    for column in ('created_at', 'updated_at', 'closed_at'):
+        if column in frame:
+            frame[column] = pd.to_datetime(frame[column], utc=True, format='ISO8601')
+    for column in ('project', 'state', 'milestone', 'epic', 'iteration'):
+        if column in frame:
+            frame[column] = frame[column].replace('', None).astype('category')
+    frame['weight'] = pd.to_numeric(frame['weight'], errors='coerce').astype('Int64')
+    frame['labels'] = frame['labels'].map(lambda value: [label.strip() for label in value.split(',')] if value else [])
+    return frame
+
+
+def issues_to_dataframe(issues, typed=True):
+    """Convert issue records to a pandas DataFrame.
+
+    With ``typed=False`` every column keeps the plain values written to the CSV.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame([issue.values() for issue in issues], columns=ISSUE_FIELDNAMES, dtype=object)
+    return typed_issue_frame(frame) if typed else frame
+
+
+def graphql_project(project_name):
+    """Return a GraphQL client for a configured project and the project's full path."""
+    from graphql_fetch import GraphQLClient
 
+    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+    gl = gitlab_client(project_name)
+    # GraphQL addresses projects by path
+    full_path = gl.projects.get(PROJECT_ID).path_with_namespace if str(PROJECT_ID).isdigit() else PROJECT_ID
+    return GraphQLClient(GITLAB_URL, PRIVATE_TOKEN, session=gl.session), full_path
 
 
-@cli.command()
-@click.option('--project_name', required=True, help='Name of the project to use.')
-@click.option('--output', default='open_issues.csv', help='Output CSV file for open issues.')
-@click.option('--all', is_flag=True, help='Include closed issues as well.')
-@click.option('--closed', is_flag=True, help="pull only closed issues")
-def pull_issues(project_name, output, all, closed):
-    """Fetch and export all open issues to a CSV file."""
+def connect_project(project_name, engine='rest'):
+    """Return the project and a ``fetch(state, updated_after, search, labels, minimal)`` yielding IssueRecords."""
     GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
-    gl = gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN)
+    gl = gitlab_client(project_name)
+    project = gl.projects.get(PROJECT_ID, lazy=True)
 
-    # Get the project
-    project = gl.projects.get(PROJECT_ID)
+    if engine == 'graphql':
+        from graphql_fetch import iter_issue_attributes, iter_issue_titles
+
+        client, full_path = graphql_project(project_name)
 
-    # Get open or closed issues
-    if closed:
-        issues = project.issues.list(state='closed', get_all=True)
+        def fetch(state, updated_after=None, search=None, labels=None, minimal=False):
+            if minimal:
+                return (IssueRecord(iid=issue['iid'], title=issue['title'])
+                        for issue in iter_issue_titles(client, full_path, state))
+            return map(IssueRecord.from_attributes,
+                       iter_issue_attributes(client, full_path, state, updated_after, search, labels))
+    else:
+        def fetch(state, updated_after=None, search=None, labels=None, minimal=False):
+            params = {'state': state, 'per_page': 100}
+            if updated_after:
+                params['updated_after'] = updated_after
+            if search:
+                params.update({'search': search, 'in': 'title'})
+            if labels:
+                params['labels'] = ','.join(labels)
+            return map(IssueRecord.from_attributes, gl.http_list(project.issues.path, query_data=params, iterator=True))
+
+    return project, fetch
+
+
+def sync_issue_store(fetch, store, project_id, full=False):
+    """Pull issues updated since the last sync into the local store, keyed by the configured project id.
+
+    With ``full`` every issue is listed again and stored issues missing from the
+    listing are removed, catching anything incremental syncs or webhooks missed.
+    """
+    high_water_mark = store.high_water_mark(project_id)
+    if full:
+        logger.info("Reconciling the issue store with a full listing")
+    elif high_water_mark:
+        logger.info(f"Fetching issues updated after {high_water_mark}")
     else:
-        issues = project.issues.list(state='opened', get_all=True)
+        logger.info("No previous sync found, fetching all issues")
+
+    seen_iids = set()
+    milestones = {}
+
+    def updated_rows():
+        nonlocal high_water_mark
+        for issue in fetch('all', None if full else high_water_mark):
+            row = issue.to_row()
+            row['updated_at'] = issue.updated_at
+            high_water_mark = max(high_water_mark or '', issue.updated_at)
+            seen_iids.add(issue.iid)
+            # Remember milestone titles so webhook events can resolve milestone ids
+            if issue.milestone_id is not None:
+                milestones[issue.milestone_id] = issue.milestone
+            yield row
+
+    count = store.upsert(project_id, updated_rows())
+    for milestone_id, title in milestones.items():
+        store.set_milestone(milestone_id, title)
+    if high_water_mark:
+        store.set_high_water_mark(project_id, high_water_mark)
+    if full:
+        removed = store.delete_missing(project_id, seen_iids)
+        logger.info(f"Removed {removed} issues no longer in the project")
+    logger.info(f"Synced {count} updated issues into {store.path}")
+
+
+@contextmanager
+def replaced_on_success(output):
+    """Yield a temporary path next to ``output`` that replaces it only if the block succeeds.
+
+    A failed fetch halfway through an export then leaves the previous file intact.
+    """
+    temporary = f'{output}.{os.getpid()}.tmp'
+    try:
+        yield temporary
+        os.replace(temporary, output)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def write_issue_rows(output, rows, progress_every=500, fieldnames=ISSUE_FIELDNAMES):
+    """Stream issue rows into a CSV file, logging progress every ``progress_every`` rows."""
+    count = 0
+    with replaced_on_success(output) as temporary, open(temporary, mode='w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % progress_every == 0:
+                logger.info(f"Exported {count} issues")
+    logger.info(f"Exported {count} issues to {output}")
+    return count
+
+
+def export_issue_rows(output, rows, format='csv', progress_every=500, fieldnames=ISSUE_FIELDNAMES):
+    """Write issue rows as CSV, or as a typed Parquet/Feather frame.
+
+    The output only changes once every row is written. Time spent waiting for
+    rows is profiled as fetching, the rest as writing.
+    """
+    rows = profiler.timed('fetch', rows)
+    with profiler.phase('write'):
+        if format == 'csv':
+            return write_issue_rows(output, rows, progress_every, fieldnames)
+
+        import pandas as pd
+        frame = typed_issue_frame(pd.DataFrame(list(rows), columns=fieldnames, dtype=object))
+        try:
+            with replaced_on_success(output) as temporary:
+                if format == 'parquet':
+                    frame.to_parquet(temporary, index=False)
+                else:
+                    frame.to_feather(temporary)
+        except ImportError as e:
+            raise click.ClickException(f'{format} export requires pyarrow - {e}')
+    logger.info(f"Exported {len(frame)} issues to {output}")
+    return len(frame)
+
+
+def project_issue_rows(project_name, all, closed, store, engine='rest', offline=False):
+    """Yield the export rows of one configured project, page by page.
+
+    With ``offline`` the rows come straight from the store without any API call.
+    """
+    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+
+    if store:
+        if all:
+            states = None
+        elif closed:
+            states = ['closed']
+        else:
+            states = ['opened']
+
+        with IssueStore(store) as issue_store:
+            if not offline:
+                project, fetch = connect_project(project_name, engine)
+                sync_issue_store(fetch, issue_store, PROJECT_ID)
+            yield from issue_store.rows(PROJECT_ID, states)
+        return
+
+    project, fetch = connect_project(project_name, engine)
+
+    # Get open or closed issues, page by page
+    states = ['closed'] if closed else ['opened']
 
     # Add closed issues if pulling all
     if all:
-        issues += project.issues.list(state='closed', get_all=True)
-
-    # Prepare data for CSV
-    with open(output, mode='w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['id', 'iid', 'title', 'epic', 'milestone', 'iteration', 'labels', 'author', 'created_at', 'description', 'state', 'weight']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for issue in issues:
-            logger.info(f"Processing issue {issue.id} - {issue.title}")
-            writer.writerow({
-                'id': issue.id,
-                'iid': issue.iid,
-                'title': issue.title,
-                'epic': issue.epic["title"] if issue.epic else '',
-                'milestone': issue.milestone["title"] if issue.milestone else '',
-                'iteration': issue.iteration['start_date'] if issue.attributes['iteration'] is not None else '',
-                'labels': ', '.join(issue.labels),
-                'author': issue.author['name'],
-                'created_at': issue.created_at,
-                'description': issue.description,
-                'state': issue.state,
-                'weight': issue.weight if 'weight' in issue.attributes else ''
-            })
-
-    click.echo(f'Issues exported to {output}')
-def pull_issues(project_name, output, all):
-    """Fetch and export all open issues to a CSV file."""
+        states.append('closed')
+
+    for state in states:
+        for issue in fetch(state):
+            yield issue.to_row()
+
+
+def iter_group_issue_pages(gl, group_id, state, workers=4, per_page=100):
+    """Yield the pages of a group's issues in order, fetching up to ``workers`` pages at once.
+
+    GitLab leaves out X-Total-Pages for large collections; pages are then
+    requested in batches of ``workers`` until one comes back short.
+    """
+    def get_page(page):
+        response = gl.http_request('get', f'/groups/{group_id}/issues',
+                                   query_data={'state': state, 'per_page': per_page, 'page': page})
+        return response.json(), response.headers
+
+    issues, headers = get_page(1)
+    yield issues
+    if headers.get('X-Total-Pages'):
+        for issues, _ in run_ordered(get_page, range(2, int(headers['X-Total-Pages']) + 1), workers):
+            yield issues
+        return
+
+    page = 2
+    while len(issues) == per_page:
+        for issues, _ in run_ordered(get_page, range(page, page + workers), workers):
+            if issues:
+                yield issues
+            if len(issues) < per_page:
+                break
+        page += workers
+
+
+def group_issue_rows(project_name, all, closed, workers=4):
+    """Yield the export rows of every project in the group of a configured project, with a project column."""
     GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
-    gl = gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN)
+    gl = gitlab_client(project_name)
 
-    # Get the project
-    project = gl.projects.get(PROJECT_ID)
+    states = ['opened', 'closed'] if all else ['closed'] if closed else ['opened']
+    for state in states:
+        for issues in iter_group_issue_pages(gl, GROUP_ID, state, workers):
+            for issue in records_from_page(issues):
+                yield dict(issue.to_row(), project=issue.project)
 
-    # Get all open issues
-    open_issues = project.issues.list(get_all=True)
 
-    # Prepare data for CSV
-    with open(output, mode='w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['id', 'iid', 'title', 'epic', 'milestone', 'iteration', 'labels', 'author', 'created_at', 'description', 'state', 'weight']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        for issue in open_issues:
-            logger.info(f"Processing issue {issue.id} - {issue.title}")
-            print(issue)
-            writer.writerow({
-                'id': issue.id,
-                'iid': issue.iid,
-                'title': issue.title,
-                'epic': issue.epic["title"] if issue.epic else '',
-                'milestone': issue.milestone["title"] if issue.milestone else '',
-                'iteration': issue.iteration['start_date'] if issue.attributes['iteration'] is not None else '',
-                'labels': ', '.join(issue.labels),
-                'author': issue.author['name'],
-                'created_at': issue.created_at,
-                'description': issue.description,
-                'state': issue.state,
-                'weight': issue.weight if 'weight' in issue.attributes else ''
-            })
-
-    print(issues_to_dataframe(open_issues))
-
-    click.echo(f'Open issues exported to {output}')
+def project_output(output, project_name):
+    """Per-project file name: fill a {project} placeholder or suffix the file stem."""
+    if '{project}' in output:
+        return output.format(project=project_name)
+    stem, extension = os.path.splitext(output)
+    return f'{stem}_{project_name}{extension}'
+
+
+@cli.command()
+@click.option('--project_name', multiple=True, help='Name of the project to use; repeat for several projects.')
+@click.option('--all-projects', is_flag=True, help='Export every project in config.ini.')
+@click.option('--output', default=None, help='Output file for open issues [default: open_issues.<format>].')
+@click.option('--all', is_flag=True, help='Include closed issues as well.')
+@click.option('--closed', is_flag=True, help="pull only closed issues")
+@click.option('--store', default=None, help='SQLite issue store for incremental syncs; only issues updated since the last run are fetched.')
+@click.option('--progress-every', default=500, show_default=True, help='Log progress after this many issues.')
+@click.option('--format', 'format', type=click.Choice(['csv', 'parquet', 'feather']), default='csv', show_default=True,
+              help='Output format; parquet and feather keep typed columns.')
+@click.option('--combined', is_flag=True, help='Write all projects into one file with a project column.')
+@click.option('--workers', default=4, show_default=True, help='Number of projects exported in parallel.')
+@click.option('--engine', type=click.Choice(['rest', 'graphql']), default='rest', show_default=True,
+              help='Fetch issues through the REST API or a GraphQL query of only the exported fields.')
+@click.option('--offline', is_flag=True, help='Export straight from --store (e.g. a mirror kept by serve) without syncing.')
+@click.option('--scope', type=click.Choice(['project', 'group']), default='project', show_default=True,
+              help="Export the configured project, or every project of its group_id with a project column.")
+@click.option('--page-workers', default=4, show_default=True, help='Number of group issue pages fetched in parallel.')
+def pull_issues(project_name, all_projects, output, all, closed, store, progress_every, format, combined, workers, engine,
+                offline, scope, page_workers):
+    """Fetch and export all open issues to a CSV file."""
+    if offline and not store:
+        raise click.UsageError('--offline needs --store.')
+    project_names = resolve_project_names(project_name, all_projects)
+    output = output or f'open_issues.{format}'
+
+    if scope == 'group':
+        if store or engine != 'rest':
+            raise click.UsageError('--scope group works on the REST engine without --store.')
+        # Projects sharing a group are exported once
+        groups = {}
+        for name in project_names:
+            GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(name)
+            groups.setdefault((GITLAB_URL, GROUP_ID), name)
+        group_names = list(groups.values())
+
+        def export_group(name, group_output):
+            export_issue_rows(group_output, group_issue_rows(name, all, closed, page_workers), format, progress_every,
+                              ['project'] + ISSUE_FIELDNAMES)
+            click.echo(f'Issues of the group of {name} exported to {group_output}')
+
+        if len(group_names) == 1:
+            export_group(group_names[0], output)
+        else:
+            run_per_project(lambda name: export_group(name, project_output(output, name)), group_names, workers)
+        return
+
+    if len(project_names) == 1 and not combined:
+        # Write each issue as soon as its page arrives
+        export_issue_rows(output, project_issue_rows(project_names[0], all, closed, store, engine, offline), format, progress_every)
+        click.echo(f'Issues exported to {output}')
+        return
+
+    if combined:
+        errors = {}
+        sources = {name: lambda name=name: project_issue_rows(name, all, closed, store, engine, offline)
+                   for name in project_names}
+        rows = (dict(row, project=name) for name, row in merge_streams(sources, workers, errors))
+        export_issue_rows(output, rows, format, progress_every, ['project'] + ISSUE_FIELDNAMES)
+        click.echo(f'Issues of {len(project_names) - len(errors)} projects exported to {output}')
+        for name, error in errors.items():
+            click.echo(f'Project {name} failed - {error}')
+        if errors:
+            raise click.ClickException(f'{len(errors)} of {len(project_names)} projects failed.')
+        return
+
+    def export_project(name):
+        project_file = project_output(output, name)
+        export_issue_rows(project_file, project_issue_rows(name, all, closed, store, engine, offline), format,
+                          progress_every)
+        click.echo(f'Issues of {name} exported to {project_file}')
+
+    run_per_project(export_project, project_names, workers)
 
 @cli.command()
 @click.option('--project_name', required=True, help='Name of the project to use.')
 @click.option('--input', required=True, help='Input CSV file to update issues.')
-def update_issues(project_name, input):
+@click.option('--lookup-cache', default=None, help='JSON file caching group epics, milestones and iterations between runs.')
+@click.option('--lookup-ttl', default=300, show_default=True, help='Seconds a cached group lookup stays valid.')
+@click.option('--fuzzy-threshold', default=0.85, show_default=True,
+              help='Similarity (0-1) an epic or milestone title needs to be suggested for a misspelled one; 1 disables.')
+@click.option('--apply-fuzzy', is_flag=True, help='Use suggested epic and milestone titles instead of only reporting them.')
+@click.option('--workers', default=1, show_default=True, help='Number of rows to process concurrently.')
+@click.option('--dry-run', is_flag=True, help='Report what would change without updating any issue.')
+@click.option('--chunk-size', default=500, show_default=True, help='Rows fetched, diffed and applied together.')
+@click.option('--journal', default=None, help='JSONL journal of row outcomes [default: <input>.journal].')
+@click.option('--resume', is_flag=True, help='Skip rows the journal records as applied or unchanged.')
+def update_issues(project_name, input, lookup_cache, lookup_ttl, fuzzy_threshold, apply_fuzzy, workers, dry_run,
+                  chunk_size, journal, resume):
     """Update issues from a CSV file."""
-    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
-    gl = gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN)
+    import pandas as pd
+    from issue_diff import compute_changes, format_changes
+    from update_journal import UpdateJournal
 
-    # Read the CSV file
-    with open(input, mode='r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        issues_to_update = [row for row in reader]
+    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+    gl = gitlab_client(project_name)
 
     # Get the project
     project = gl.projects.get(PROJECT_ID)
 
-    # Update issues based on the CSV data
-    for row in issues_to_update:
-        issue_id = row['iid']  # Convert ID to integer
+    # Resolve epics, milestones and iterations once for all rows
+    lookup = GroupLookup(gl, project.namespace['id'], cache_path=lookup_cache, ttl=lookup_ttl,
+                         fuzzy_threshold=fuzzy_threshold, apply_fuzzy=apply_fuzzy)
+
+    # Pause all workers when GitLab reports the rate limit is close
+    limiter = RateLimiter()
+    limiter.install(gl.session)
 
+    existing = changed = processed = skipped = failed = 0
+    start = time.monotonic()
+    # Work through the CSV a chunk at a time, journaling every row so an interrupted run can resume
+    with open(input, mode='r', newline='', encoding='utf-8') as csvfile, \
+            UpdateJournal(journal or f'{input}.journal', resume) as update_journal:
+        reader = csv.DictReader(csvfile)
+        rows = enumerate(reader)
+        while chunk := list(islice(rows, chunk_size)):
+            pending = [(index, row) for index, row in chunk if not update_journal.is_done(index, row)]
+            skipped += len(chunk) - len(pending)
+            if not pending:
+                continue
+
+            # Fetch the chunk's issues, 100 iids per request
+            with profiler.phase('fetch'):
+                issues_by_iid = fetch_issues_by_iid(project, [int(row['iid']) for _, row in pending if row['iid'] != ""])
+
+            # Diff the rows against the fetched issues and keep only rows that need API calls
+            with profiler.phase('diff'):
+                changes = compute_changes(pd.DataFrame([row for _, row in pending], columns=reader.fieldnames,
+                                                       index=[index for index, _ in pending]),
+                                          issues_to_dataframe(issues_by_iid.values(), typed=False))
+            unchanged = set(changes.index[~changes['changed']])
+            existing += len(changes)
+            changed += int(changes['changed'].sum())
+
+            if dry_run:
+                for line in format_changes(changes, lookup.describe):
+                    click.echo(line)
+                for index, row in pending:
+                    if row['iid'] == "":
+                        click.echo(f"New issue: {row['title']}")
+                    elif int(row['iid']) not in issues_by_iid:
+                        click.echo(f"Issue ID {row['iid']} not found")
+                continue
+
+            for index, row in pending:
+                if index in unchanged:
+                    update_journal.record(index, row, 'unchanged')
+            to_apply = [(index, row) for index, row in pending if index not in unchanged]
+
+            # Update issues based on the CSV data, reporting errors in input order
+            with profiler.phase('write'):
+                results = run_ordered(lambda entry: apply_row(lookup, project, issues_by_iid, entry[1]), to_apply,
+                                      workers, limiter)
+                for (index, row), message in zip(to_apply, results):
+                    if message:
+                        click.echo(message)
+                        update_journal.record(index, row, 'failed', message)
+                        failed += 1
+                    else:
+                        update_journal.record(index, row, 'created' if row['iid'] == "" else 'applied')
+            processed += len(to_apply)
+
+    click.echo(f"{changed} of {existing} existing issues have changes")
+    if skipped:
+        click.echo(f"Skipped {skipped} rows already done according to the journal")
+    if dry_run:
+        return
+    elapsed = time.monotonic() - start
+    click.echo(f'Processed {processed} rows in {elapsed:.1f}s '
+               f'({processed / max(elapsed, 1e-9):.1f} rows/sec)')
+    if failed:
+        click.echo(f'{failed} rows failed, rerun with --resume to retry only those')
+
+
+def fetch_issues_by_iid(project, iids, batch_size=100):
+    """Fetch issues with the list endpoint's iids[] filter, returning an iid -> IssueRecord map."""
+    iids = sorted(set(iids))
+    issues_by_iid = {}
+    for start in range(0, len(iids), batch_size):
+        batch = iids[start:start + batch_size]
+        page = project.manager.gitlab.http_list(project.issues.path, query_data={'iids[]': batch, 'per_page': batch_size},
+                                                get_all=True)
+        for issue in records_from_page(page):
+            issues_by_iid[issue.iid] = issue
+    logger.info(f"Fetched {len(issues_by_iid)} of {len(iids)} issues")
+    return issues_by_iid
+
+
+def apply_row(lookup, project, issues_by_iid, row):
+    """Create or update the issue for one CSV row, returning an error message if it failed."""
+    import gitlab
+    import requests
+
+    issue_id = row['iid']
+    name = f'Issue ID {issue_id}' if issue_id != "" else f"New issue {row['title']}"
+
+    try:
         if issue_id == "":
-            create_issue(gl, project, row)
+            unresolved = create_issue(lookup, project, row)
         else:
-            try:
-                issue = project.issues.get(int(issue_id))
-                update_issue(gl, project, issue, row)
-            except gitlab.exceptions.GitlabGetError as e:
-                click.echo(f'Issue ID {issue_id} not found - {e}')
-            except gitlab.exceptions.GitlabUpdateError as e:
-                click.echo(f'Issue ID {issue_id} could not be updated - {e}')
+            issue = issues_by_iid.get(int(issue_id))
+            if issue is None:
+                raise gitlab.exceptions.GitlabGetError('404 Not found', 404)
+            unresolved = update_issue(lookup, project, issue, row)
+    except gitlab.exceptions.GitlabGetError as e:
+        return f'Issue ID {issue_id} not found - {e}'
+    except gitlab.exceptions.GitlabUpdateError as e:
+        return f'Issue ID {issue_id} could not be updated - {e}'
+    except gitlab.exceptions.GitlabCreateError as e:
+        if issue_id == "":
+            return f'{name} could not be created - {e}'
+        return f'{name} could not be added to its epic - {e}'
+    # Any other failure must stay with its row, or rows already sent by other workers would go unjournaled
+    except (gitlab.exceptions.GitlabError, requests.RequestException) as e:
+        return f'{name} failed - {e}'
+    # Journaled as failed, so --resume retries the row once the titles are fixed
+    if unresolved:
+        return f'{name} not {"created" if issue_id == "" else "fully updated"}, unresolved {", ".join(unresolved)}'
+    return None
+
 
 @cli.command()
 @click.option('--project_name', required=True, help='Name of the project to use.')
 @click.option('--input', required=True, help='Input CSV file to determine issues to keep.')
-def close_issues(project_name, input):
+@click.option('--workers', default=8, show_default=True, help='Number of issues closed concurrently.')
+@click.option('--engine', type=click.Choice(['rest', 'graphql']), default='rest', show_default=True,
+              help='List open issues through the REST API or a GraphQL query of only iid and title.')
+@click.option('--store', default=None, help='Take the open issues from this issue store (e.g. a mirror kept by serve).')
+def close_issues(project_name, input, workers, engine, store):
     """Close issues that are not present in the input CSV file."""
-    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
-    gl = gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN)
+    import gitlab
 
     # Read the CSV file
     with open(input, mode='r', newline='', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile)
         issue_ids_to_keep = {row['iid'] for row in reader}
 
-    # Get the project
-    project = gl.projects.get(PROJECT_ID)
-
-    # Get all issues
-    all_issues = project.issues.list(get_all=True)
+    # Get the open issues, keeping only their iid and title
+    project, fetch = connect_project(project_name, engine)
+    if store:
+        GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+        with IssueStore(store) as issue_store:
+            open_issues = [(int(row['iid']), row['title']) for row in issue_store.rows(PROJECT_ID, ['opened'])]
+    else:
+        with profiler.phase('fetch'):
+            open_issues = [(issue.iid, issue.title) for issue in fetch('opened', minimal=True)]
 
     # Determine issues to close
-    issues_to_close = [issue for issue in all_issues if str(issue.iid) not in issue_ids_to_keep]
+    issues_to_close = [(iid, title) for iid, title in open_issues if str(iid) not in issue_ids_to_keep]
 
     # Print issues to close
     if issues_to_close:
         click.echo('The following issues will be closed:')
-        for issue in issues_to_close:
-            click.echo(f"ID: {issue.iid}, Title: {issue.title}")
+        for iid, title in issues_to_close:
+            click.echo(f"ID: {iid}, Title: {title}")
 
         # Confirm closure
         confirmation = click.prompt('Type "close" to confirm closure of the above issues', type=str)
         if confirmation.lower() == 'close':
-            for issue in issues_to_close:
-                logger.info(f"Closing issue ID {issue.iid} - {issue.title}")
-                issue.state_event = 'close'
-                issue.save()
-            click.echo('Issues not present in the CSV have been closed.')
+            def close(entry):
+                iid, title = entry
+                logger.info(f"Closing issue ID {iid} - {title}")
+                try:
+                    project.issues.update(iid, {'state_event': 'close'})
+                except gitlab.exceptions.GitlabUpdateError as e:
+                    return e
+                return None
+
+            limiter = RateLimiter()
+            limiter.install(project.manager.gitlab.session)
+            errors = []
+            with profiler.phase('write'), click.progressbar(length=len(issues_to_close), label='Closing issues') as bar:
+                for (iid, title), error in zip(issues_to_close, run_ordered(close, issues_to_close, workers, limiter)):
+                    if error is not None:
+                        errors.append((iid, title, error))
+                    bar.update(1)
+
+            for iid, title, error in errors:
+                click.echo(f'Issue ID {iid} could not be closed - {error}')
+            click.echo(f'Closed {len(issues_to_close) - len(errors)} of {len(issues_to_close)} issues not present in the CSV.')
         else:
             click.echo('Closure aborted.')
     else:
         click.echo('No issues to close.')
 
 @cli.command()
-@click.option('--project_name', required=True, help='Name of the project to use.')
-def log_time(project_name):
+@click.option('--project_name', multiple=True, help='Name of the project to use; repeat for several projects.')
+@click.option('--all-projects', is_flag=True, help='Log time in every project in config.ini.')
+@click.option('--workers', default=4, show_default=True, help='Number of projects processed in parallel.')
+@click.option('--engine', type=click.Choice(['rest', 'graphql']), default='rest', show_default=True,
+              help='Fetch issues through the REST API or a GraphQL query of only the needed fields.')
+@click.option('--ledger', default='time_ledger.db', show_default=True,
+              help='SQLite ledger of logged time; entries already logged today are skipped on reruns.')
+@click.option('--post-workers', default=4, show_default=True, help='Number of spent-time entries posted concurrently.')
+def log_time(project_name, all_projects, workers, engine, ledger, post_workers):
     """Log time spent on an issue."""
-    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
-    gl = gitlab.Gitlab(GITLAB_URL, private_token=PRIVATE_TOKEN)
+    run_per_project(partial(log_project_time, engine=engine, ledger=ledger, workers=post_workers),
+                    resolve_project_names(project_name, all_projects), workers)
 
-    # Get the project
-    project = gl.projects.get(PROJECT_ID)
 
-    active_labels = ['STATUS::Doing', 'Testing']
+def log_project_time(project_name, engine='rest', ledger='time_ledger.db', workers=4):
+    """Spread each user's daily allocation over the active issues of one project."""
+    import gitlab
 
-    # Get the issue
-    issues = project.issues.list(state='opened', get_all=True)
+    GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+    project, fetch = connect_project(project_name, engine)
+
+    active_labels = ['STATUS::Doing', 'Testing']
 
-    # Get the specific issue with the title 'USER ALLOCATION'
+    # Get the specific issue with the title 'USER ALLOCATION' through a title search
     user_allocation_issue = None
-    for issue in issues:
-        if issue.title == 'USER ALLOCATION':
-            user_allocation_issue = issue
-            break
+    with profiler.phase('fetch'):
+        for issue in fetch('opened', search='USER ALLOCATION'):
+            if issue.title == 'USER ALLOCATION':
+                user_allocation_issue = issue
+                break
 
     if user_allocation_issue:
         logger.info(f"Found issue with title 'USER_ALLOCATION': ID {user_allocation_issue.iid}")
@@ -255,138 +729,277 @@ def log_time(project_name):
 
     logger.info(f"User allocations: {user_allocations}")
 
-    # Filter issues by active labels
-    filtered_issues = [issue for issue in issues if any(label in issue.labels for label in active_labels)]
+    # Fetch issues carrying any active label; the labels filter matches all labels, so query each one
+    active_issues = {}
+    with profiler.phase('fetch'):
+        for label in active_labels:
+            for issue in fetch('opened', labels=[label]):
+                active_issues[issue.iid] = issue
+    filtered_issues = list(active_issues.values())
 
     issues_by_user = defaultdict(list)
 
     for issue in filtered_issues:
-        assignees = issue.assignees
-        for assignee in assignees:
-            issues_by_user[assignee['username']].append(issue)
+        for username in issue.assignees:
+            issues_by_user[username].append(issue)
+
+    with TimeLedger(ledger) as time_ledger:
+        today = date.today().isoformat()
+        already_logged = time_ledger.logged(today, PROJECT_ID)
+
+        entries = []
+        for user, issues in issues_by_user.items():
+            time_per_ticket = format_time(7.6/len(issues)*user_allocations[user])
+            logger.info(f"{len(issues)} assigned to {user} - logging {time_per_ticket} for each issue.")
+
+            for issue in issues:
+                if (user, issue.iid) in already_logged:
+                    logger.info(f"{issue.iid} - already logged for {user} today, skipping")
+                    continue
+                entries.append((user, issue, time_per_ticket))
+
+        def post(entry):
+            user, issue, time_per_ticket = entry
+            logger.info(f"{issue.iid} - {issue.title} - {issue.labels}")
+            try:
+                project.issues.get(issue.iid, lazy=True).add_spent_time(time_per_ticket)
+            except gitlab.exceptions.GitlabError as e:
+                return e
+            return None
+
+        # Post concurrently, recording every success so a rerun resumes after the failures
+        limiter = RateLimiter()
+        limiter.install(project.manager.gitlab.session)
+        failed = 0
+        with profiler.phase('write'):
+            for (user, issue, time_per_ticket), error in zip(entries, run_ordered(post, entries, workers, limiter)):
+                if error is None:
+                    time_ledger.record(today, PROJECT_ID, user, issue.iid, time_per_ticket)
+                else:
+                    click.echo(f"Issue ID {issue.iid} time could not be logged for {user} - {error}")
+                    failed += 1
+        if failed:
+            raise click.ClickException(f'{failed} of {len(entries)} spent-time entries failed, rerun to retry them.')
+
+
+BURNDOWN_COLUMNS = ['created_at', 'closed_at', 'state', 'milestone', 'iteration']
+
+
+def load_issue_file(path, columns):
+    """Read the given columns from an issue export written by pull_issues."""
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        frame = pd.read_parquet(path)
+    elif extension == '.feather':
+        frame = pd.read_feather(path)
+    else:
+        frame = pd.read_csv(path, usecols=lambda column: column in columns, dtype=str)
+    if 'closed_at' not in frame:
+        raise click.ClickException(f'{path} has no closed_at column, export it again with pull_issues.')
+    return frame[[column for column in columns if column in frame]]
 
-    for user, issues in issues_by_user.items():
-        time_per_ticket = format_time(7.6/len(issues)*user_allocations[user])
-        logger.info(f"{len(issues)} assigned to {user} - logging {time_per_ticket} for each issue.")
 
-        for issue in issues:
-            logger.info(f"{issue.iid} - {issue.title} - {issue.labels}")
-            issue.add_spent_time(time_per_ticket)
+def fetch_burndown_snapshot(project_name, snapshot, max_age):
+    """Return created/closed dates of every issue, reusing ``snapshot`` while it is younger than ``max_age`` seconds.
 
+    Only the burndown columns are queried, through GraphQL. The snapshot records
+    the project it was taken of and is not reused for another one.
+    """
+    import pandas as pd
+    from graphql_fetch import iter_burndown_rows
 
-def format_time(hours: float) -> str:
-    hours_int = int(hours)
-    minutes = int((hours - hours_int) * 60)
-    return f'{hours_int}h{minutes}m'
+    if os.path.exists(snapshot) and time.time() - os.path.getmtime(snapshot) < max_age:
+        frame = pd.read_csv(snapshot, dtype=str, keep_default_na=False)
+        if 'project' in frame and len(frame) and (frame['project'] == project_name).all():
+            logger.info(f"Using burndown snapshot {snapshot}")
+            return frame[BURNDOWN_COLUMNS]
+        logger.info(f"Burndown snapshot {snapshot} is not of {project_name}, fetching again")
 
+    client, full_path = graphql_project(project_name)
+    frame = pd.DataFrame(list(iter_burndown_rows(client, full_path)), columns=BURNDOWN_COLUMNS)
+    with replaced_on_success(snapshot) as temporary:
+        frame.assign(project=project_name).to_csv(temporary, index=False)
+    logger.info(f"Saved burndown snapshot of {len(frame)} issues to {snapshot}")
+    return frame
 
-def get_iteration_id(gl, group_id, start_date):
-    iterations = gl.groups.get(group_id).iterations.list(get_all=True)
-    for iteration in iterations:
-        logger.info(iteration.attributes['start_date'])
-        if start_date.strip() == iteration.attributes['start_date']:
-            return iteration.iid
-    logger.error(f"Iteration with start date {start_date} not found")
-    pass
 
+@cli.command()
+@click.option('--input', default=None, help='Issues exported by pull_issues (CSV, Parquet or Feather).')
+@click.option('--store', default=None, help='SQLite issue store maintained by pull_issues --store (needs --project_name).')
+@click.option('--project_name', default=None, help='Name of the project to use when reading the store or fetching live.')
+@click.option('--snapshot', default=None, help='Cache of created/closed dates for live fetches [default: burndown_snapshot_<project_name>.csv].')
+@click.option('--max-age', default=3600, show_default=True, help='Seconds a live snapshot is reused before fetching again.')
+@click.option('--freq', type=click.Choice(['daily', 'weekly', 'monthly']), default='weekly', show_default=True, help='Burndown period.')
+@click.option('--group-by', type=click.Choice(['milestone', 'iteration']), default=None, help='Draw one chart per milestone or iteration.')
+@click.option('--output', default='burndown.png', show_default=True, help='Chart image file.')
+def burndown(input, store, project_name, snapshot, max_age, freq, group_by, output):
+    """Render a burndown chart from exported, stored or live issue data."""
+    import pandas as pd
+    import burndown as burndown_chart
+
+    if store and not project_name:
+        raise click.UsageError('--store needs --project_name.')
+    if not (input or store or project_name):
+        raise click.UsageError('Pass --input, --store or --project_name.')
+
+    with profiler.phase('fetch'):
+        if input:
+            frame = load_issue_file(input, BURNDOWN_COLUMNS)
+        elif store:
+            GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(project_name)
+            with IssueStore(store) as issue_store:
+                frame = pd.DataFrame(list(issue_store.rows(PROJECT_ID)), columns=ISSUE_FIELDNAMES)[BURNDOWN_COLUMNS]
+        else:
+            snapshot = snapshot or f"burndown_snapshot_{re.sub(r'[^A-Za-z0-9-]+', '_', project_name)}.csv"
+            frame = fetch_burndown_snapshot(project_name, snapshot, max_age)
 
-def normalize_string(s):
-    # Replace different hyphen characters with a standard hyphen
-    s = re.sub(r'[-–—]', '-', s)  # Replace various hyphen characters with a standard hyphen
-    # Remove any other special characters (if needed)
-    s = re.sub(r'[^a-zA-Z0-9\s-]', '', s)  # Keep only alphanumeric characters, spaces, and hyphens
-    return s.strip().lower()  # Convert to lowercase for case-insensitive comparison
+    with profiler.phase('compute'):
+        df = burndown_chart.issues_to_df(frame.replace('', None))
+        burndown_df = burndown_chart.compute_burndown(df, freq=freq, group_by=group_by)
 
+    with profiler.phase('render'):
+        if group_by is None:
+            burndown_chart.create_burndown_chart(burndown_df, output)
+            click.echo(f'Burndown chart written to {output}')
+            return
 
-def cmp_str(str1, str2):
-    normalized_str1 = normalize_string(str1)
-    normalized_str2 = normalize_string(str2)
-    return normalized_str1 == normalized_str2
+        stem, extension = os.path.splitext(output)
+        for group, group_df in burndown_df.groupby(level=0):
+            group_output = f"{stem}_{re.sub(r'[^A-Za-z0-9-]+', '_', str(group)).strip('_')}{extension}"
+            burndown_chart.create_burndown_chart(group_df.droplevel(0), group_output, title=f'Burndown Chart - {group}')
+            click.echo(f'Burndown chart for {group} written to {group_output}')
 
 
-def get_epic(gl, group_id, epic_title):
-    epics = gl.groups.get(group_id).epics.list(get_all=True, state='opened')
-    logger.debug(f'epics: {epics}')
-    for epic in epics:
-        if cmp_str(epic.title, epic_title):
-            return gl.groups.get(group_id).epics.get(epic.iid)
-    logger.error(f'epic {epic_title} not found.')
-    return None
+@cli.command()
+@click.option('--store', required=True, help='SQLite issue store to keep in sync from webhook events.')
+@click.option('--project_name', multiple=True, help='Name of the project to mirror; repeat for several projects.')
+@click.option('--all-projects', is_flag=True, help='Mirror every project in config.ini.')
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on.')
+@click.option('--port', default=8080, show_default=True, help='Port to listen on.')
+@click.option('--secret', envvar='GITLAB_WEBHOOK_SECRET', default=None,
+              help="Secret token of the webhook [default: $GITLAB_WEBHOOK_SECRET or the project's webhook_secret].")
+@click.option('--reconcile-every', default=3600, show_default=True,
+              help='Seconds between full listings that repair missed events; 0 disables them.')
+@click.option('--engine', type=click.Choice(['rest', 'graphql']), default='rest', show_default=True,
+              help='Fetch issues through the REST API or a GraphQL query of only the exported fields.')
+def serve(store, project_name, all_projects, host, port, secret, reconcile_every, engine):
+    """Keep an issue store current from GitLab webhook events.
+
+    Point a project or group webhook (issue, milestone and epic events) at this
+    server, then export with pull_issues --store --offline.
+    """
+    import threading
+    from webhook import make_server
+
+    project_names = resolve_project_names(project_name, all_projects)
+    if secret is None:
+        secret = load_config()[project_names[0]].get('webhook_secret')
+    if not secret:
+        logger.warning("No webhook secret set, accepting events from anyone who can reach the server")
+
+    # Payloads name projects by GitLab id and path; issues are stored under the configured project id
+    project_ids = {}
+    with IssueStore(store) as issue_store:
+        for name in project_names:
+            GITLAB_URL, PROJECT_ID, GROUP_ID, PRIVATE_TOKEN = load_project_config(name)
+            project = gitlab_client(name).projects.get(PROJECT_ID)
+            project_ids[project.id] = project_ids[project.path_with_namespace] = PROJECT_ID
+            project, fetch = connect_project(name, engine)
+            sync_issue_store(fetch, issue_store, PROJECT_ID)
+
+    def reconcile():
+        while True:
+            time.sleep(reconcile_every)
+            for name in project_names:
+                try:
+                    project, fetch = connect_project(name, engine)
+                    with IssueStore(store) as issue_store:
+                        sync_issue_store(fetch, issue_store, load_project_config(name)[1], full=True)
+                except Exception:
+                    logger.exception(f"Reconciling {name} failed")
+
+    if reconcile_every > 0:
+        threading.Thread(target=reconcile, daemon=True).start()
+
+    server = make_server(host, port, store, project_ids, secret)
+    click.echo(f"Listening for webhook events on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
-def get_milestone_id(gl, group_id, milestone_title):
-    milestones = gl.groups.get(group_id).milestones.list(state='active', get_all=True)
-    logger.info(f'milestones: {milestones}')
+def format_time(hours: float) -> str:
+    hours_int = int(hours)
+    minutes = int((hours - hours_int) * 60)
+    return f'{hours_int}h{minutes}m'
 
-    for milestone in milestones:
-        if cmp_str(milestone.title, milestone_title):
-            return milestone.get_id()
-    logger.error(f'milestone "{milestone_title}" not found.')
-    return None
 
+def update_issue(lookup, project, issue, row):
+    """Send the changes a CSV row makes to an issue record in a single update.
 
-def update_issue(gl, project, issue, row):
+    Returns the epic and milestone references that could not be resolved.
+    """
     logger.info(f"Processing issue ID {issue.iid} - {issue.title}")
-    issue_updated = False
+    changes = {}
+    unresolved = []
 
     def update_field(field, value):
-        nonlocal issue_updated
         if str(getattr(issue, field, '')).strip() != str(value).strip() and value != "":
             logger.info(f"Updating {field} from {getattr(issue, field, '')} to {value}")
-            setattr(issue, field, value)
-            issue_updated = True
+            changes[field] = value
 
     def handle_epic(value):
-        nonlocal issue_updated
-        if issue.epic is not None and value == issue.epic["title"]:
+        if issue.epic is not None and value == issue.epic:
             return
-        
+
         if issue.epic is not None:
-            logger.info(f"Removing epic {issue.epic['title']}")
-            issue.epic = None
-            issue_updated = True
+            logger.info(f"Removing epic {issue.epic}")
+            changes['epic'] = None
 
         if value != "":
-            epic = get_epic(gl, project.namespace['id'], value)
-            if epic is not None:
-                epic.issues.create({'issue_id': issue.id})
+            epic = lookup.epic(value)
+            if epic is None:
+                unresolved.append(f'epic "{value}"')
+            else:
+                lookup.add_issue_to_epic(epic, issue.id)
                 logger.info(f"Added issue to epic {value}")
 
     def handle_milestone(value):
-        nonlocal issue_updated
         # Check if milestone is the same
-        if issue.milestone is not None and value == issue.milestone["title"]:
+        if issue.milestone is not None and value == issue.milestone:
             return
 
         # Remove current milestone
         if issue.milestone is not None:
-            logger.info(f"Removing milestone {issue.milestone['title']}")
-            issue.milestone = None
-            issue_updated = True
+            logger.info(f"Removing milestone {issue.milestone}")
+            changes['milestone'] = None
 
         # If incoming milestone is not empty, add it
         if value != "":
-            milestone_id = get_milestone_id(gl, project.namespace['id'], value)
-            if milestone_id is not None:
-                issue.milestone_id = milestone_id
-                issue_updated = True
+            milestone_id = lookup.milestone_id(value)
+            if milestone_id is None:
+                unresolved.append(f'milestone "{value}"')
+            else:
+                changes['milestone_id'] = milestone_id
 
     def handle_labels(value):
-        nonlocal issue_updated
         # Check if labels are the same
-        incoming_labels = value.split(',')
-        incoming_labels = [label.strip() for label in incoming_labels]
+        incoming_labels = [label.strip() for label in value.split(',') if label.strip()]
 
         if set(issue.labels) == set(incoming_labels):
             return
 
         # Add incoming labels
         logger.info(f"Updating labels {issue.labels} to {incoming_labels}")
-        issue.labels = incoming_labels
-        issue_updated = True
+        changes['labels'] = incoming_labels
 
     for key, value in row.items():
-        if key == 'author' or key == 'iteration':
+        if key in ('author', 'iteration', 'closed_at'):
             continue
         elif key == 'epic':
             handle_epic(value)
@@ -397,12 +1010,17 @@ def update_issue(gl, project, issue, row):
         else:
             update_field(key, value)
 
-    if issue_updated:
+    if changes:
         logger.info(f"Updating issue {issue.id} - {issue.title}")
-        issue.save()
+        project.issues.update(issue.iid, changes)
+    return unresolved
 
 
-def create_issue(gl, project, row):
+def create_issue(lookup, project, row):
+    """Create the issue of a CSV row, unless one of its epic and milestone references cannot be resolved.
+
+    Returns those unresolved references.
+    """
     logger.info(f"Creating new issue {row['title']}")
     new_issue_data = {
         'title': row['title'],
@@ -411,18 +1029,29 @@ def create_issue(gl, project, row):
         'weight': row['weight']
     }
 
+    unresolved = []
+
     if row['epic']:
-        epic = get_epic(gl, project.namespace['id'], row['epic'])
-        if epic is not None:
-            new_issue_data['epic_id'] = epic.id
+        epic = lookup.epic(row['epic'])
+        if epic is None:
+            unresolved.append(f'epic "{row["epic"]}"')
+        else:
+            new_issue_data['epic_id'] = epic['id']
 
     if row['milestone']:
-        milestone_id = get_milestone_id(gl, project.namespace['id'], row['milestone'])
-        if milestone_id is not None:
+        milestone_id = lookup.milestone_id(row['milestone'])
+        if milestone_id is None:
+            unresolved.append(f'milestone "{row["milestone"]}"')
+        else:
             new_issue_data['milestone_id'] = milestone_id
 
+    # Creating it anyway would create it again once the row is retried
+    if unresolved:
+        return unresolved
+
     logger.info(f"Creating new issue {new_issue_data}") 
     project.issues.create(new_issue_data)
+    return unresolved
 
 
 if __name__ == '__main__':
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""In-memory stand-in for the parts of the GitLab REST and GraphQL APIs this tool uses."""
+
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+PROJECT = {'id': 1, 'path_with_namespace': 'bench/project', 'namespace': {'id': 9}}
+GROUP = {'id': 9, 'full_path': 'bench'}
+
+
+def synthetic_issue(iid, project_id=1):
+    """Return a deterministic issue; every field varies with the iid so diffs and charts have work to do."""
+    month = 1 + iid % 12
+    closed = iid % 7 == 0
+    return {
+        'id': 100000 + iid, 'iid': iid, 'project_id': project_id, 'title': f'Issue {iid}',
+        'description': f'Synthetic issue {iid}\n' + 'Lorem ipsum dolor sit amet. ' * 8,
+        'state': 'closed' if closed else 'opened',
+        'created_at': f'2024-{month:02d}-{1 + iid % 28:02d}T10:00:00.000Z',
+        'updated_at': f'2024-{month:02d}-{1 + iid % 28:02d}T12:00:00.000Z',
+        'closed_at': f'2025-{month:02d}-{1 + iid % 28:02d}T09:00:00.000Z' if closed else None,
+        'weight': iid % 8,
+        'epic': {'id': 7, 'iid': 1, 'title': 'Epic A'} if iid % 2 else None,
+        'milestone': {'id': 5 + iid % 2, 'title': f'Milestone {1 + iid % 2}'} if iid % 3 else None,
+        'iteration': {'start_date': '2024-12-02'} if iid % 4 == 0 else None,
+        'labels': ['STATUS::Doing'] if iid % 5 == 0 else ['backlog'],
+        'assignees': [{'username': f'user{iid % 3}'}] if iid % 5 == 0 else [],
+        'author': {'name': 'Bench Author'},
+    }
+
+
+class FakeGitLab:
+    """Issues of one synthetic project plus the group metadata update_issues resolves."""
+
+    def __init__(self, issue_count):
+        self.lock = threading.Lock()
+        self.issue_count = issue_count
+        self.reset()
+
+    def reset(self):
+        """Restore the seeded issues, undoing what earlier runs changed."""
+        issue_count = self.issue_count
+        self.issues = {iid: synthetic_issue(iid) for iid in range(1, issue_count + 1)}
+        self.issues[1].update(title='USER ALLOCATION', description='@user0=0.5\n@user1=1\n@user2=0.25\n')
+        self.epics = [{'id': 7, 'iid': 1, 'title': 'Epic A', 'group_id': 9},
+                      {'id': 8, 'iid': 2, 'title': 'Epic B', 'group_id': 9}]
+        self.milestones = [{'id': 5, 'iid': 1, 'title': 'Milestone 1'}, {'id': 6, 'iid': 2, 'title': 'Milestone 2'}]
+        self.iterations = [{'id': 3, 'iid': 1, 'start_date': '2024-12-02', 'title': None}]
+        self.next_iid = issue_count + 1
+        self.version = 0
+        self.filtered = {}
+
+    def list_issues(self, state='all', updated_after=None, iids=None, labels=None, search=None):
+        """Return matching issues newest first, cached per query until an issue changes."""
+        key = (self.version, state, updated_after, tuple(iids or ()), tuple(labels or ()), search)
+        with self.lock:
+            if key in self.filtered:
+                return self.filtered[key]
+            items = [self.issues[iid] for iid in sorted(iids or self.issues, reverse=True) if iid in self.issues]
+            if state != 'all':
+                items = [issue for issue in items if issue['state'] == state]
+            if updated_after:
+                items = [issue for issue in items if issue['updated_at'] >= updated_after]
+            if labels:
+                items = [issue for issue in items if set(labels) <= set(issue['labels'])]
+            if search:
+                items = [issue for issue in items if search in issue['title']]
+            self.filtered = {key: items}
+            return items
+
+    def update_issue(self, iid, changes):
+        with self.lock:
+            issue = self.issues[iid]
+            if changes.get('state_event') == 'close':
+                issue['state'] = 'closed'
+            for field in ('title', 'description', 'weight'):
+                if field in changes:
+                    issue[field] = changes[field]
+            if 'labels' in changes:
+                labels = changes['labels']
+                issue['labels'] = [label for label in (labels.split(',') if isinstance(labels, str) else labels) if label]
+            self.version += 1
+            return issue
+
+    def create_issue(self, fields):
+        with self.lock:
+            iid = self.next_iid
+            self.next_iid += 1
+            self.issues[iid] = dict(synthetic_issue(iid), **{k: v for k, v in fields.items() if k in ('title', 'description')})
+            self.version += 1
+            return self.issues[iid]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def gitlab(self):
+        return self.server.gitlab
+
+    def send(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        headers = dict(headers or {})
+        if self.command == 'GET' and status == 200:
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_page(self, items, query, transform=None):
+        per_page = int(query.get('per_page', ['20'])[0])
+        page = int(query.get('page', ['1'])[0])
+        total_pages = max(1, -(-len(items) // per_page))
+        headers = {'X-Page': str(page), 'X-Per-Page': str(per_page), 'X-Total': str(len(items)),
+                   'X-Total-Pages': str(total_pages)}
+        if page < total_pages:
+            headers['X-Next-Page'] = str(page + 1)
+            next_query = dict(query, page=[str(page + 1)])
+            headers['Link'] = (f'<http://{self.headers["Host"]}{urlparse(self.path).path}'
+                               f'?{urlencode(next_query, doseq=True)}>; rel="next"')
+        items = items[(page - 1) * per_page:page * per_page]
+        self.send(200, [transform(item) for item in items] if transform else items, headers)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or b'{}')
+        return {key: values[0] for key, values in parse_qs(raw.decode('utf-8')).items()}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path
+
+        if re.fullmatch(r'/api/v4/projects/[^/]+', path):
+            return self.send(200, PROJECT)
+        if scope := re.fullmatch(r'/api/v4/(projects|groups)/[^/]+/issues', path):
+            issues = self.gitlab.list_issues(
+                state=query.get('state', ['all'])[0],
+                updated_after=query.get('updated_after', [None])[0],
+                iids=[int(iid) for iid in query.get('iids[]', [])],
+                labels=query['labels'][0].split(',') if 'labels' in query else None,
+                search=query.get('search', [None])[0])
+            if scope[1] == 'groups':
+                # Group listings tell issues of different projects apart by their reference
+                return self.send_page(issues, query, lambda issue: dict(
+                    issue, references={'full': f"{PROJECT['path_with_namespace']}#{issue['iid']}"}))
+            return self.send_page(issues, query)
+        if match := re.fullmatch(r'/api/v4/projects/[^/]+/issues/(\d+)', path):
+            issue = self.gitlab.issues.get(int(match[1]))
+            return self.send(200, issue) if issue else self.send(404, {'message': '404 Not found'})
+        if re.fullmatch(r'/api/v4/groups/[^/]+', path):
+            return self.send(200, GROUP)
+        if match := re.fullmatch(r'/api/v4/groups/[^/]+/(epics|milestones|iterations)', path):
+            return self.send_page(getattr(self.gitlab, match[1]), query)
+        if match := re.fullmatch(r'/api/v4/groups/[^/]+/epics/(\d+)', path):
+            return self.send(200, self.gitlab.epics[int(match[1]) - 1])
+        if re.fullmatch(r'/api/v4/groups/[^/]+/projects', path):
+            return self.send_page([PROJECT], query)
+        self.send(404, {'message': f'404 {path} Not Found'})
+
+    def do_PUT(self):
+        path = urlparse(self.path).path
+        body = self.read_body()
+        if match := re.fullmatch(r'/api/v4/projects/[^/]+/issues/(\d+)', path):
+            if int(match[1]) not in self.gitlab.issues:
+                return self.send(404, {'message': '404 Not found'})
+            return self.send(200, self.gitlab.update_issue(int(match[1]), body))
+        self.send(404, {'message': f'404 {path} Not Found'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.read_body()
+        if path == '/api/graphql':
+            return self.send(200, graphql(self.gitlab, body))
+        if re.fullmatch(r'/api/v4/projects/[^/]+/issues', path):
+            return self.send(201, self.gitlab.create_issue(body))
+        if re.fullmatch(r'/api/v4/projects/[^/]+/issues/\d+/add_spent_time', path):
+            return self.send(201, {'time_estimate': 0, 'total_time_spent': 0})
+        if re.fullmatch(r'/api/v4/groups/[^/]+/epics/\d+/issues(/\d+)?', path):
+            return self.send(201, {'id': 1, 'issue': {}, 'epic': {}})
+        self.send(404, {'message': f'404 {path} Not Found'})
+
+
+def graphql_time(value):
+    """GraphQL leaves out the milliseconds REST timestamps carry."""
+    return value.replace('.000Z', 'Z') if value else value
+
+
+def graphql(gitlab, body):
+    """Answer the issues queries of graphql_fetch, using the offset as cursor."""
+    variables = body['variables']
+    issues = gitlab.list_issues(state=variables.get('state') or 'all', updated_after=variables.get('updatedAfter'),
+                                labels=variables.get('labelName'), search=variables.get('search'))
+    start = int(variables.get('after') or 0)
+    first = variables.get('first') or 20
+    nodes = [{
+        'id': f"gid://gitlab/Issue/{issue['id']}", 'iid': str(issue['iid']), 'title': issue['title'],
+        'description': issue['description'], 'state': issue['state'], 'createdAt': graphql_time(issue['created_at']),
+        'updatedAt': graphql_time(issue['updated_at']), 'closedAt': graphql_time(issue['closed_at']),
+        'weight': issue['weight'],
+        'epic': {'title': issue['epic']['title']} if issue['epic'] else None,
+        'milestone': {'title': issue['milestone']['title']} if issue['milestone'] else None,
+        'iteration': {'startDate': issue['iteration']['start_date']} if issue['iteration'] else None,
+        'labels': {'nodes': [{'title': label} for label in issue['labels']]},
+        'author': issue['author'], 'assignees': {'nodes': issue['assignees']},
+    } for issue in issues[start:start + first]]
+    page_info = {'hasNextPage': start + first < len(issues), 'endCursor': str(start + first)}
+    return {'data': {'project': {'issues': {'pageInfo': page_info, 'nodes': nodes}}}}
+
+
+def start(issue_count, host='127.0.0.1', port=0):
+    """Serve a fake GitLab with ``issue_count`` issues on a background thread."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.gitlab = FakeGitLab(issue_count)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Replay recorded webhook payloads into an issue store and read it back like the exports do.
+
+Every ``payloads/*.json`` file is applied with ``webhook.apply_event`` to a store
+seeded with REST-synced issues of the fake GitLab. The check fails when a stored
+timestamp is not in the REST form or when the typed export frame or the
+burndown counts cannot be built from the store. Run it directly or with
+``python -m pytest bench/replay_webhooks.py``.
+"""
+
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+
+import click
+
+import fake_gitlab
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+PAYLOAD_DIR = os.path.join(BENCH_DIR, 'payloads')
+sys.path.insert(0, REPO_DIR)
+
+from issue_record import ISSUE_FIELDNAMES, IssueRecord  # noqa: E402
+from issue_store import IssueStore  # noqa: E402
+from webhook import apply_event  # noqa: E402
+
+PROJECT_ID = '1'
+# What the REST API returns, and so what synced rows hold
+REST_TIMESTAMP = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z')
+
+
+def seed_store(store, issue_count):
+    rows = []
+    for iid in range(1, issue_count + 1):
+        issue = IssueRecord.from_attributes(fake_gitlab.synthetic_issue(iid))
+        row = issue.to_row()
+        row['updated_at'] = issue.updated_at
+        rows.append(row)
+        if issue.milestone_id is not None:
+            store.set_milestone(issue.milestone_id, issue.milestone)
+    store.upsert(PROJECT_ID, rows)
+
+
+def replay(paths, issue_count=20):
+    """Apply the payloads at ``paths`` to a fresh store, returning a list of problems found."""
+    import pandas as pd
+    import burndown
+    from app import typed_issue_frame
+
+    problems = []
+    with tempfile.TemporaryDirectory(prefix='gitlab_assistant_webhooks_') as workdir:
+        with IssueStore(os.path.join(workdir, 'issues.db')) as store:
+            seed_store(store, issue_count)
+            for path in paths:
+                with open(path, encoding='utf-8') as f:
+                    payload = json.load(f)
+                if apply_event(store, PROJECT_ID, payload) is None:
+                    problems.append(f'{os.path.basename(path)} was ignored')
+            rows = list(store.rows(PROJECT_ID))
+
+    for row in rows:
+        for column in ('created_at', 'updated_at', 'closed_at'):
+            if row[column] and not REST_TIMESTAMP.fullmatch(row[column]):
+                problems.append(f"issue {row['iid']} {column} stored as {row[column]!r}")
+
+    frame = pd.DataFrame(rows, columns=ISSUE_FIELDNAMES + ['updated_at'], dtype=object)
+    try:
+        typed_issue_frame(frame)
+    except (ValueError, TypeError) as e:
+        problems.append(f'typed export failed: {e}')
+    try:
+        df = burndown.issues_to_df(frame[['created_at', 'closed_at', 'state']].replace('', None))
+        burndown.compute_burndown(df, freq='W-MON')
+    except (ValueError, TypeError) as e:
+        problems.append(f'burndown failed: {e}')
+    return problems
+
+
+def payload_paths():
+    return sorted(glob.glob(os.path.join(PAYLOAD_DIR, '*.json')))
+
+
+def test_recorded_payloads():
+    assert payload_paths(), f'no payloads in {PAYLOAD_DIR}'
+    assert replay(payload_paths()) == []
+
+
+@click.command()
+@click.argument('paths', nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def main(paths):
+    """Replay PATHS (default: every recorded payload) and report store rows the readers cannot use."""
+    problems = replay(paths or payload_paths())
+    for problem in problems:
+        click.echo(problem, err=True)
+    click.echo(f"{len(paths or payload_paths())} payloads replayed, {len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark the CLI against a local fake GitLab seeded with synthetic issues.
+
+Every scenario runs app.py in a subprocess with ``--profile-output`` and appends
+one record per scenario and size to a JSONL results file, tagged with the
+current commit. The summary compares each number with the latest record of a
+different commit, so a change can be checked with::
+
+    git stash; python bench/run_bench.py --sizes 10000
+    git stash pop; python bench/run_bench.py --sizes 10000
+"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import click
+
+import fake_gitlab
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP = os.path.join(REPO_DIR, 'app.py')
+
+
+def derive_updates(source, target, every=100):
+    """Copy an export, retitling every ``every``-th issue so update_issues has real work to do."""
+    with open(source, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    for row in rows:
+        if int(row['iid']) % every == 0:
+            row['title'] += ' (edited)'
+    with open(target, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+# name -> (setup commands, measured command); commands run in order in one working directory
+SCENARIOS = {
+    'pull_issues': ([], ['pull-issues', '--project_name', 'bench', '--all', '--output', 'issues.csv']),
+    'pull_issues_graphql': ([], ['pull-issues', '--project_name', 'bench', '--all', '--engine', 'graphql',
+                                 '--output', 'issues_graphql.csv']),
+    'pull_issues_group': ([], ['pull-issues', '--project_name', 'bench', '--all', '--scope', 'group',
+                               '--output', 'group_issues.csv']),
+    'pull_issues_store_resync': ([['pull-issues', '--project_name', 'bench', '--all', '--store', 'issues.db',
+                                   '--output', 'store.csv']],
+                                 ['pull-issues', '--project_name', 'bench', '--all', '--store', 'issues.db',
+                                  '--output', 'store.csv']),
+    'update_issues': ([derive_updates],
+                      ['update-issues', '--project_name', 'bench', '--input', 'updates.csv', '--workers', '4']),
+    'burndown': ([], ['burndown', '--input', 'issues.csv', '--output', 'burndown.png']),
+}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def run_cli(args, workdir, env, profile=None):
+    """Run app.py, returning the wall time including interpreter startup and the profile report."""
+    command = [sys.executable, APP] + (['--profile-output', profile] if profile else []) + args
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise click.ClickException(f"{' '.join(args)} failed:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    if profile is None:
+        return seconds, None
+    with open(profile, encoding='utf-8') as f:
+        return seconds, json.load(f)
+
+
+def run_scenario(name, server, workdir, env):
+    server.gitlab.reset()
+    setup, args = SCENARIOS[name]
+    for step in setup:
+        if callable(step):
+            step(os.path.join(workdir, 'issues.csv'), os.path.join(workdir, 'updates.csv'))
+        else:
+            run_cli(step, workdir, env)
+    return run_cli(args, workdir, env, os.path.join(workdir, f'{name}_profile.json'))
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_record(history, record):
+    """Return the latest record of the same scenario and size made at another commit."""
+    for old in reversed(history):
+        if (old['scenario'], old['size']) == (record['scenario'], record['size']) and old['commit'] != record['commit']:
+            return old
+    return None
+
+
+def change(new, old):
+    if not old:
+        return ''
+    return f'{(new - old) / old:+.0%}'
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000', show_default=True, help='Comma separated issue counts.')
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(list(SCENARIOS)),
+              help='Scenario to run; repeat for several [default: all].')
+@click.option('--repeat', default=1, show_default=True, help='Runs per scenario; the fastest one is recorded.')
+@click.option('--results', default=os.path.join(BENCH_DIR, 'results.jsonl'), show_default=True,
+              help='JSONL file the records are appended to.')
+def main(sizes, scenarios, repeat, results):
+    """Run the benchmark scenarios and compare them with the last recorded commit."""
+    scenarios = scenarios or list(SCENARIOS)
+    # burndown and update_issues read the export of pull_issues
+    if any(name in ('burndown', 'update_issues') for name in scenarios) and 'pull_issues' not in scenarios:
+        scenarios = ['pull_issues'] + list(scenarios)
+    commit, dirty = git_revision()
+    history = load_results(results)
+    records = []
+
+    for size in [int(size) for size in sizes.split(',')]:
+        server = fake_gitlab.start(size)
+        with tempfile.TemporaryDirectory(prefix='gitlab_assistant_bench_') as workdir:
+            config_path = os.path.join(workdir, 'config.ini')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                f.write(f'[bench]\nurl = http://127.0.0.1:{server.server_port}\nproject_id = 1\ngroup_id = 9\n'
+                        f'access_token = bench\n')
+            env = dict(os.environ, GITLAB_ASSISTANT_CONFIG=config_path)
+
+            for name in scenarios:
+                runs = [run_scenario(name, server, workdir, env) for _ in range(repeat)]
+                seconds, profile = min(runs, key=lambda run: run[0])
+                records.append({
+                    'commit': commit,
+                    'dirty': dirty,
+                    'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                    'scenario': name,
+                    'size': size,
+                    'seconds': round(seconds, 3),
+                    'api_calls': profile['api']['calls'],
+                    'bytes_received': profile['api']['bytes_received'],
+                    'phases': profile['phases'],
+                    'max_rss_kb': profile.get('max_rss_kb'),
+                })
+                click.echo(f"{name} {size}: {seconds:.2f}s", err=True)
+        server.shutdown()
+        server.server_close()
+
+    with open(results, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+    click.echo(f"{'scenario':<26}{'size':>8}{'seconds':>10}{'':>6}{'calls':>8}{'':>6}{'rss MB':>9}{'':>6}  vs")
+    for record in records:
+        old = previous_record(history, record)
+        rss = (record['max_rss_kb'] or 0) / 1024
+        click.echo(f"{record['scenario']:<26}{record['size']:>8}"
+                   f"{record['seconds']:>10.2f}{change(record['seconds'], old and old['seconds']):>6}"
+                   f"{record['api_calls']:>8}{change(record['api_calls'], old and old['api_calls']):>6}"
+                   f"{rss:>9.1f}{change(record['max_rss_kb'], old and old['max_rss_kb']):>6}"
+                   f"  {old['commit'] if old else '-'}")
+    click.echo(f"Results of {commit}{' (dirty)' if dirty else ''} appended to {results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Check that the CLI starts quickly and leaves heavy dependencies unloaded.
+
+Runs ``app.py --help`` and ``app.py log-time --help`` several times and reports
+the median wall time over a bare interpreter start. It fails when that exceeds
+the budget, when pandas, numpy, matplotlib or pyarrow get imported or when a
+log file is created. Cron jobs invoke the CLI many times a minute, so run this
+before merging changes to module-level imports, directly (the exit code tells
+the result) or with ``python -m pytest bench/startup.py``.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(REPO_DIR, 'app.py')
+
+# Only the commands that need them may import these
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'pyarrow')
+
+COMMANDS = [['--help'], ['log-time', '--help']]
+
+
+def imported_modules(args, workdir=None):
+    """Return the top-level modules imported while running app.py, from ``-X importtime``."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', APP] + args, cwd=workdir, capture_output=True,
+                            text=True, check=True)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+
+def median_seconds(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def check_startup(budget=0.15, runs=7, echo=print):
+    """Time the commands and return a list of failures, empty when startup is within budget."""
+    failures = []
+    # Interpreter startup varies a lot between machines, so only the tool's own share is budgeted
+    baseline = median_seconds([sys.executable, '-c', 'pass'], runs)
+    echo(f'{"python -c pass":<24}{baseline * 1000:>8.0f} ms')
+    for args in COMMANDS:
+        command = ' '.join(['app.py'] + args)
+        seconds = median_seconds([sys.executable, APP] + args, runs) - baseline
+        with tempfile.TemporaryDirectory(prefix='gitlab_assistant_startup_') as workdir:
+            heavy = sorted(imported_modules(args, workdir).intersection(HEAVY_MODULES))
+            created = sorted(os.listdir(workdir))
+        echo(f'{command:<24}{seconds * 1000:>+8.0f} ms  {"imports " + ", ".join(heavy) if heavy else ""}')
+        if seconds > budget:
+            failures.append(f'{command} took {seconds:.3f}s, budget is {budget:.3f}s')
+        if heavy:
+            failures.append(f'{command} imported {", ".join(heavy)}')
+        if created:
+            failures.append(f'{command} created {", ".join(created)}')
+    return failures
+
+
+def test_startup():
+    failures = check_startup(runs=5)
+    assert not failures, '\n'.join(failures)
+
+
+@click.command()
+@click.option('--budget', default=0.15, show_default=True,
+              help='Maximum median seconds app.py may add to a bare interpreter start.')
+@click.option('--runs', default=7, show_default=True, help='Runs per command.')
+def main(budget, runs):
+    """Fail when startup is slower than --budget, loads heavy dependencies or writes files."""
+    failures = check_startup(budget, runs, click.echo)
+    for failure in failures:
+        click.echo(failure, err=True)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import pandas as pd
+
+import burndown
+
+
+def naive_counts(df, edges):
+    """Count each period by scanning every issue, as the chart was first computed."""
+    counts = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        created = ((df['created_at'] >= start) & (df['created_at'] < end)).sum()
+        completed = ((df['closed_at'] >= start) & (df['closed_at'] < end)).sum()
+        open_issues = (df['created_at'] < end).sum() - (df['closed_at'] < end).sum()
+        counts.append((created, completed, open_issues))
+    return counts
+
+
+def test_monthly_counts_of_the_sample():
+    result = burndown.compute_burndown(burndown.issues_to_df(burndown.issues), freq='monthly')
+    assert list(result.index) == list(pd.date_range('2023-01-01', periods=3, freq='MS'))
+    assert result['created'].tolist() == [10, 8, 6]
+    assert result['completed'].tolist() == [4, 4, 12]
+    assert result['open'].tolist() == [6, 10, 4]
+
+
+def test_matches_a_full_scan_for_every_frequency():
+    df = burndown.issues_to_df(burndown.issues)
+    for freq in burndown.FREQUENCIES.values():
+        result = burndown.compute_burndown(df, freq=freq)
+        edges = burndown.period_edges(df, freq)
+        assert [tuple(row) for row in result[['created', 'completed', 'open']].to_numpy()] == naive_counts(df, edges)
+
+
+def test_grouped_counts_share_periods_and_add_up():
+    df = burndown.issues_to_df(burndown.issues).assign(milestone=['M1', 'M2'] * 12)
+    grouped = burndown.compute_burndown(df, freq='weekly', group_by='milestone')
+    total = burndown.compute_burndown(df, freq='weekly')
+    assert set(grouped.index.get_level_values('milestone')) == {'M1', 'M2'}
+    pd.testing.assert_frame_equal(grouped.groupby(level='date').sum(), total, check_dtype=False, check_freq=False)
+
+
+def test_mixed_timestamp_forms_and_empty_input():
+    df = burndown.issues_to_df([{'created_at': '2024-01-01T10:00:00.000Z', 'closed_at': '2024-01-02T10:00:00Z',
+                                 'state': 'closed'},
+                                {'created_at': '2024-01-03', 'closed_at': None, 'state': 'opened'}])
+    assert burndown.compute_burndown(df, freq='monthly')['open'].tolist() == [1]
+    assert burndown.compute_burndown(df.iloc[:0], freq='monthly').empty
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from app import issues_to_dataframe
+from issue_diff import compute_changes, format_changes
+from issue_record import IssueRecord
+
+
+def make_issue(iid, **attributes):
+    return IssueRecord.from_attributes(dict({'id': 100 + iid, 'iid': iid, 'title': f'Issue {iid}', 'labels': []},
+                                            **attributes))
+
+
+def round_trip(issues, edits=None):
+    """Return the CSV rows an export of ``issues`` reads back as, with ``edits`` (iid -> fields) applied."""
+    rows = issues_to_dataframe(issues, typed=False).astype(object).fillna('').astype(str)
+    for iid, fields in (edits or {}).items():
+        for field, value in fields.items():
+            rows.loc[rows['iid'] == str(iid), field] = value
+    return rows
+
+
+def changes_of(issues, edits=None):
+    changes = compute_changes(round_trip(issues, edits), issues_to_dataframe(issues, typed=False))
+    return changes.set_index(changes['iid'].astype(int))
+
+
+def test_exported_rows_are_unchanged():
+    issues = [make_issue(1), make_issue(2, labels=['a', 'b'], epic={'title': 'Epic A'},
+                                        milestone={'id': 5, 'title': 'M1'}, weight=3)]
+    assert not changes_of(issues)['changed'].any()
+
+
+def test_empty_labels_cell_is_no_labels():
+    changes = changes_of([make_issue(1)], {1: {'labels': ''}})
+    assert not changes.loc[1, 'changed']
+    assert changes.loc[1, 'labels_added'] == []
+
+
+def test_label_changes():
+    changes = changes_of([make_issue(1, labels=['a', 'b'])], {1: {'labels': 'b, c'}})
+    assert changes.loc[1, 'labels_added'] == ['c']
+    assert changes.loc[1, 'labels_removed'] == ['a']
+
+
+def test_epic_and_milestone_moves():
+    issues = [make_issue(1, epic={'title': 'Epic A'}), make_issue(2, milestone={'id': 5, 'title': 'M1'})]
+    changes = changes_of(issues, {1: {'epic': 'Epic B'}, 2: {'milestone': 'M2'}})
+    assert changes['changed'].all()
+    assert (changes.loc[1, 'epic_from'], changes.loc[1, 'epic_to']) == ('Epic A', 'Epic B')
+    assert (changes.loc[2, 'milestone_from'], changes.loc[2, 'milestone_to']) == ('M1', 'M2')
+    assert pd.isna(changes.loc[1, 'milestone_to'])
+
+
+def test_empty_plain_field_is_ignored():
+    changes = changes_of([make_issue(1, description='text')], {1: {'description': '', 'title': 'New'}})
+    assert changes.loc[1, 'changed_fields'] == ['title']
+    assert format_changes(changes) == ['Issue ID 1: title']
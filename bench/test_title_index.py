@@ -0,0 +1,37 @@
+from group_lookup import TitleIndex
+
+ITEMS = [{'id': 1, 'title': 'Sprint 13'}, {'id': 2, 'title': '2024 Q1 Release'}, {'id': 3, 'title': 'Milestone – Two!'},
+         {'id': 4, 'title': 'Platform Epic'}, {'id': 5, 'title': 'Platform Epics'}]
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    index = TitleIndex(ITEMS)
+    assert index.get('milestone - two')['id'] == 3
+    assert index.match('Sprint 13') == (ITEMS[0], 1.0, None)
+
+
+def test_titles_with_other_numbers_never_match():
+    index = TitleIndex(ITEMS, apply_fuzzy=True)
+    assert index.get('Sprint 12') is None
+    assert index.get('2024 Q2 Release') is None
+
+
+def test_fuzzy_match_is_only_suggested_by_default():
+    index = TitleIndex(ITEMS)
+    item, score, problem = index.match('Milestone Tow')
+    assert item['id'] == 3 and score < 1 and problem is None
+    assert index.get('Milestone Tow') is None
+    assert 'not applied' in index.describe('Milestone Tow')
+
+
+def test_fuzzy_match_applied_on_request():
+    assert TitleIndex(ITEMS, apply_fuzzy=True).get('Milestone Tow')['id'] == 3
+
+
+def test_close_candidates_are_ambiguous():
+    item, score, problem = TitleIndex(ITEMS, apply_fuzzy=True).match('Platform Epicz')
+    assert item is None and problem.startswith('not found and ambiguous')
+
+
+def test_threshold_of_one_disables_fuzzy_matching():
+    assert TitleIndex(ITEMS, threshold=1, apply_fuzzy=True).get('Milestone Tow') is None
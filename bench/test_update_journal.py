@@ -0,0 +1,57 @@
+import json
+
+from update_journal import UpdateJournal
+
+ROW = {'iid': '1', 'title': 'Issue 1'}
+
+
+def test_done_rows_are_skipped_on_resume(tmp_path):
+    path = tmp_path / 'updates.journal'
+    with UpdateJournal(path) as journal:
+        journal.record(0, ROW, 'applied')
+        journal.record(1, dict(ROW, iid='2'), 'unchanged')
+        journal.record(2, dict(ROW, iid='3'), 'failed', 'Issue ID 3 failed - 500')
+    resumed = UpdateJournal(path, resume=True)
+    assert resumed.is_done(0, ROW)
+    assert resumed.is_done(1, dict(ROW, iid='2'))
+    assert not resumed.is_done(2, dict(ROW, iid='3'))
+
+
+def test_edited_rows_are_redone(tmp_path):
+    path = tmp_path / 'updates.journal'
+    with UpdateJournal(path) as journal:
+        journal.record(0, ROW, 'applied')
+    assert not UpdateJournal(path, resume=True).is_done(0, dict(ROW, title='Edited'))
+
+
+def test_later_failure_undoes_earlier_success(tmp_path):
+    path = tmp_path / 'updates.journal'
+    with UpdateJournal(path) as journal:
+        journal.record(0, ROW, 'applied')
+        journal.record(0, ROW, 'failed', 'boom')
+    assert not UpdateJournal(path, resume=True).is_done(0, ROW)
+
+
+def test_partial_last_line_is_ignored_and_terminated(tmp_path):
+    path = tmp_path / 'updates.journal'
+    with UpdateJournal(path) as journal:
+        journal.record(0, ROW, 'applied')
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"row": 1, "iid": "2", "fingerp')
+    with UpdateJournal(path, resume=True) as journal:
+        assert journal.is_done(0, ROW)
+        journal.record(1, dict(ROW, iid='2'), 'applied')
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert json.loads(lines[-1])['row'] == 1
+
+
+def test_without_resume_the_journal_starts_over_on_first_record(tmp_path):
+    path = tmp_path / 'updates.journal'
+    with UpdateJournal(path) as journal:
+        journal.record(0, ROW, 'applied')
+    journal = UpdateJournal(path)
+    assert not journal.is_done(0, ROW)
+    assert path.read_text(encoding='utf-8')
+    journal.record(5, ROW, 'failed')
+    journal.close()
+    assert [json.loads(line)['row'] for line in path.read_text(encoding='utf-8').splitlines()] == [5]
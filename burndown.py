@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
+import matplotlib
+matplotlib.use('Agg')  # Render to files, no display needed
 import matplotlib.pyplot as plt
 
+# Period frequencies supported by compute_burndown
+FREQUENCIES = {'daily': 'D', 'weekly': 'W-MON', 'monthly': 'MS'}
+
 issues = [
     {'created_at': '2023-01-01', 'updated_at': '2023-01-03', 'closed_at': '2023-01-05', 'state': 'closed'},
     {'created_at': '2023-01-02', 'updated_at': '2023-01-04', 'closed_at': '2023-01-06', 'state': 'closed'},
@@ -33,24 +39,76 @@ issues = [
 
 def issues_to_df(issues):
     df = pd.DataFrame(issues)
-    df['created_at'] = pd.to_datetime(df['created_at'])
-    df['closed_at'] = pd.to_datetime(df['closed_at'])
+    df['created_at'] = pd.to_datetime(df['created_at'], utc=True, format='ISO8601').dt.tz_localize(None)
+    df['closed_at'] = pd.to_datetime(df['closed_at'], utc=True, format='ISO8601').dt.tz_localize(None)
     df['state'] = df['state'].astype(str)
     return df
 
-def create_burndown_chart(burndown_df):
+def to_datetime64(series):
+    # Naive UTC datetime64[ns] values, whatever the input timezone or resolution
+    series = pd.to_datetime(series, utc=True, format='ISO8601').dt.tz_localize(None)
+    return series.dropna().to_numpy(dtype='datetime64[ns]')
+
+def period_edges(df, freq):
+    # Period boundaries from the start of the first period to the end of the last one
+    offset = pd.tseries.frequencies.to_offset(freq)
+    timestamps = np.concatenate([to_datetime64(df['created_at']), to_datetime64(df['closed_at'])])
+    first = offset.rollback(pd.Timestamp(timestamps.min()).normalize())
+    edges = pd.date_range(start=first, end=pd.Timestamp(timestamps.max()), freq=offset)
+    return edges.append(pd.DatetimeIndex([edges[-1] + offset]))
+
+def count_periods(df, edges):
+    created = np.sort(to_datetime64(df['created_at']))
+    closed = np.sort(to_datetime64(df['closed_at']))
+    bounds = edges.to_numpy(dtype='datetime64[ns]')
+    created_before = np.searchsorted(created, bounds, side='left')
+    closed_before = np.searchsorted(closed, bounds, side='left')
+
+    burndown_df = pd.DataFrame({
+        'date': edges[:-1],
+        'created': np.diff(created_before),
+        'completed': np.diff(closed_before),
+        'open': created_before[1:] - closed_before[1:]
+    }).set_index('date')
+    return burndown_df
+
+def compute_burndown(df, freq='MS', group_by=None):
+    """Count issues created, completed and still open per period.
+
+    Each count comes from a binary search of the sorted created_at/closed_at
+    values against the period boundaries, so the cost is O(issues log issues)
+    whatever the number of periods. ``freq`` is a pandas frequency or one of
+    FREQUENCIES. With ``group_by`` (e.g. 'milestone' or 'iteration') the result
+    is indexed by (group, date), all groups sharing the same periods.
+    """
+    freq = FREQUENCIES.get(freq, freq)
+    if df.empty:
+        return pd.DataFrame(columns=['created', 'completed', 'open'], index=pd.DatetimeIndex([], name='date'))
+
+    edges = period_edges(df, freq)
+    if group_by is None:
+        return count_periods(df, edges)
+
+    groups = {key: count_periods(group, edges) for key, group in df.groupby(group_by, observed=True, sort=True)}
+    return pd.concat(groups, names=[group_by])
+
+def create_burndown_chart(burndown_df, output='burndown.png', title='Burndown Chart'):
+    # Bars fill most of each period, whatever the frequency
+    width = 0.8 * (burndown_df.index[1] - burndown_df.index[0]).days if len(burndown_df) > 1 else 0.8
+
     # Plot the stacked bar chart
     plt.figure(figsize=(10, 6))
-    plt.bar(burndown_df.index, burndown_df['created'], label='Created')
-    plt.bar(burndown_df.index, burndown_df['open'] - burndown_df['created'] + burndown_df['completed'], bottom=burndown_df['created'], label='Open')
-    plt.bar(burndown_df.index, burndown_df['completed'], bottom=burndown_df['open'], label='Completed')
+    plt.bar(burndown_df.index, burndown_df['created'], width=width, label='Created')
+    plt.bar(burndown_df.index, burndown_df['open'] - burndown_df['created'] + burndown_df['completed'], bottom=burndown_df['created'], width=width, label='Open')
+    plt.bar(burndown_df.index, burndown_df['completed'], bottom=burndown_df['open'], width=width, label='Completed')
     plt.xlabel('Date')
     plt.ylabel('Number of Issues')
-    plt.title('Burndown Chart')
+    plt.title(title)
     plt.legend()
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    plt.savefig(output)
+    plt.close()
 
 def main():
     # Convert the list of issues to a DataFrame
@@ -58,40 +116,8 @@ def main():
 
     print(df)
 
-    # Create a date range from the earliest created date to the latest completed date
-
-    # date_range = pd.date_range(start=df['created'].min(), end=df['completed'].max(), freq='W-MON')
-    date_range = pd.date_range(start=df['created_at'].min(), end=df['closed_at'].max(), freq='MS')
-
-    print(date_range)
-
-    # Initialize lists to store the number of issues created and completed each day
-    created_counts = []
-    completed_counts = []
-    open_counts = []
-
-    for date in date_range:
-        created_count = df[(df['created_at'] >= date) & (df['created_at'] < date + pd.offsets.MonthBegin(1))].shape[0]
-        completed_count = df[(df['closed_at'] >= date) & (df['closed_at'] < date + pd.offsets.MonthBegin(1))].shape[0]
-        open_count = df[(df['created_at'] < date + pd.offsets.MonthBegin(1))].shape[0]
-        print(f"date: {date}, created: {created_count}, completed: {completed_count}, open: {open_count}")
-        open_counts.append(open_count)
-        created_counts.append(created_count)
-        completed_counts.append(completed_count)
-
-    print(created_counts)
-    print(completed_counts)
-    print(open_counts)
-
-    return
-
-    burndown_df = pd.DataFrame({
-        'date': date_range,
-        'created': created_counts,
-        'completed': completed_counts
-    }).set_index('date')
-
-    burndown_df['open'] = burndown_df['created'].cumsum() - burndown_df['completed'].cumsum()
+    # Count created, completed and open issues per month
+    burndown_df = compute_burndown(df, freq='MS')
 
     print(burndown_df)
 
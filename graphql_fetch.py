@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import logging
+
+import requests
+
+from issue_record import rest_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Only the fields pull_issues and log_time read
+ISSUES_QUERY = """
+query($fullPath: ID!, $state: IssuableState, $updatedAfter: Time, $search: String, $in: [IssuableSearchableField!],
+      $labelName: [String], $first: Int, $after: String) {
+  project(fullPath: $fullPath) {
+    issues(state: $state, updatedAfter: $updatedAfter, search: $search, in: $in, labelName: $labelName,
+           first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        id
+        iid
+        title
+        description
+        state
+        createdAt
+        updatedAt
+        closedAt
+        weight
+        epic { title }
+        milestone { title }
+        iteration { startDate }
+        labels { nodes { title } }
+        author { name }
+        assignees { nodes { username } }
+      }
+    }
+  }
+}
+"""
+
+# Just enough to list issues, e.g. when picking the ones to close
+ISSUE_TITLES_QUERY = """
+query($fullPath: ID!, $state: IssuableState, $first: Int, $after: String) {
+  project(fullPath: $fullPath) {
+    issues(state: $state, first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { iid title }
+    }
+  }
+}
+"""
+
+
+# The dates, state and grouping fields burndown charts are drawn from
+BURNDOWN_QUERY = """
+query($fullPath: ID!, $first: Int, $after: String) {
+  project(fullPath: $fullPath) {
+    issues(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        state
+        createdAt
+        closedAt
+        milestone { title }
+        iteration { startDate }
+      }
+    }
+  }
+}
+"""
+
+
+class GraphQLError(Exception):
+    pass
+
+
+class GraphQLClient:
+    """Minimal client for GitLab's GraphQL endpoint (``<url>/api/graphql``)."""
+
+    def __init__(self, url, private_token, session=None):
+        self.endpoint = url.rstrip('/') + '/api/graphql'
+        self.private_token = private_token
+        self.session = session or requests.Session()
+
+    def query(self, query, variables):
+        response = self.session.post(self.endpoint, json={'query': query, 'variables': variables},
+                                     headers={'PRIVATE-TOKEN': self.private_token})
+        response.raise_for_status()
+        result = response.json()
+        if result.get('errors'):
+            raise GraphQLError('; '.join(error['message'] for error in result['errors']))
+        return result['data']
+
+
+def node_to_attributes(node):
+    """Map an issue node onto the REST attribute names used by issue_to_row."""
+    return {
+        'id': int(node['id'].rsplit('/', 1)[-1]),
+        'iid': int(node['iid']),
+        'title': node['title'],
+        'description': node['description'],
+        'state': node['state'],
+        'created_at': rest_timestamp(node['createdAt']),
+        'updated_at': rest_timestamp(node['updatedAt']),
+        'closed_at': rest_timestamp(node['closedAt']) or None,
+        'weight': node['weight'],
+        'epic': node['epic'],
+        'milestone': node['milestone'],
+        'iteration': {'start_date': node['iteration']['startDate']} if node['iteration'] else None,
+        'labels': [label['title'] for label in node['labels']['nodes']],
+        'author': node['author'],
+        'assignees': node['assignees']['nodes'],
+    }
+
+
+def iter_issue_nodes(client, query, variables):
+    """Follow the issues connection of a project query cursor by cursor, yielding its nodes."""
+    variables = dict(variables, after=None)
+    while True:
+        project = client.query(query, variables)['project']
+        if project is None:
+            raise GraphQLError(f"Project {variables['fullPath']} not found")
+        issues = project['issues']
+        yield from issues['nodes']
+        if not issues['pageInfo']['hasNextPage']:
+            return
+        variables['after'] = issues['pageInfo']['endCursor']
+
+
+def iter_issue_attributes(client, full_path, state='opened', updated_after=None, search=None, labels=None,
+                          page_size=100):
+    """Yield the issues of a project page by page using cursor pagination.
+
+    ``search`` matches issue titles and ``labels`` keeps issues carrying all of
+    the given labels.
+    """
+    variables = {'fullPath': full_path, 'state': state, 'first': page_size}
+    if updated_after:
+        variables['updatedAfter'] = updated_after
+    if search:
+        variables['search'] = search
+        variables['in'] = ['TITLE']
+    if labels:
+        variables['labelName'] = list(labels)
+
+    for node in iter_issue_nodes(client, ISSUES_QUERY, variables):
+        yield node_to_attributes(node)
+
+
+def iter_issue_titles(client, full_path, state='opened', page_size=100):
+    """Yield only the iid and title of each issue."""
+    variables = {'fullPath': full_path, 'state': state, 'first': page_size}
+    for node in iter_issue_nodes(client, ISSUE_TITLES_QUERY, variables):
+        yield {'iid': int(node['iid']), 'title': node['title']}
+
+
+def iter_burndown_rows(client, full_path, page_size=100):
+    """Yield ``(created_at, closed_at, state, milestone, iteration)`` of every issue, open or closed."""
+    variables = {'fullPath': full_path, 'first': page_size}
+    for node in iter_issue_nodes(client, BURNDOWN_QUERY, variables):
+        yield (rest_timestamp(node['createdAt']), rest_timestamp(node['closedAt']), node['state'],
+               node['milestone']['title'] if node['milestone'] else '',
+               node['iteration']['startDate'] if node['iteration'] else '')
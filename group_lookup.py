@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from difflib import SequenceMatcher
+
+logger = logging.getLogger(__name__)
+
+
+HYPHENS = re.compile(r'[-–—]')
+SPECIAL_CHARACTERS = re.compile(r'[^a-zA-Z0-9\s-]')
+NUMBERS = re.compile(r'\d+')
+
+
+def normalize_string(s):
+    # Replace different hyphen characters with a standard hyphen
+    s = HYPHENS.sub('-', s)
+    # Keep only alphanumeric characters, spaces, and hyphens
+    s = SPECIAL_CHARACTERS.sub('', s)
+    return s.strip().lower()  # Convert to lowercase for case-insensitive comparison
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Find items by title, exactly or approximately.
+
+    Exact matches on the normalized title are a dict lookup. Otherwise titles
+    sharing enough character trigrams with the query are gathered through an
+    inverted index, starting from the query's rarest trigrams so common words
+    cost nothing, and the closest few are scored with difflib's similarity
+    ratio. Titles whose numbers differ from the query's never match, so
+    "Sprint 12" is not taken for "Sprint 13". ``get`` only returns such
+    approximate matches with ``apply_fuzzy``; otherwise it reports them.
+    """
+
+    def __init__(self, items, kind='item', threshold=0.85, margin=0.05, min_overlap=0.5, candidates=8,
+                 apply_fuzzy=False):
+        self.kind = kind
+        self.threshold = threshold
+        self.apply_fuzzy = apply_fuzzy
+        self.margin = margin
+        self.min_overlap = min_overlap
+        self.candidates = candidates
+        self.exact = {}
+        self.keys = []
+        self.grams = []
+        self.numbers = []
+        self.postings = {}
+        for item in items:
+            key = normalize_string(item['title'])
+            if key in self.exact:
+                if self.exact[key]['id'] != item['id']:
+                    logger.warning(f'{kind} "{item["title"]}" has the same title as another {kind}, '
+                                   f'using the first one')
+                continue
+            self.exact[key] = item
+            grams = trigrams(key)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(len(self.keys))
+            self.keys.append(key)
+            self.grams.append(grams)
+            self.numbers.append(NUMBERS.findall(key))
+
+    def search(self, title, limit=3):
+        """Return up to ``limit`` ``(score, item)`` pairs resembling ``title`` and with the same numbers, best first."""
+        key = normalize_string(title)
+        grams = trigrams(key)
+        numbers = NUMBERS.findall(key)
+        # A title sharing at least `needed` trigrams must share one of the rarest len(grams) - needed + 1
+        needed = max(1, math.ceil(self.min_overlap * len(grams)))
+        rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))[:len(grams) - needed + 1]
+        positions = {position for gram in rarest for position in self.postings.get(gram, ())}
+
+        overlaps = []
+        for position in positions:
+            if self.numbers[position] != numbers:
+                continue
+            shared = len(grams & self.grams[position])
+            if shared >= needed:
+                overlaps.append((2 * shared / (len(grams) + len(self.grams[position])), position))
+        overlaps.sort(reverse=True)
+
+        scored = [(SequenceMatcher(None, key, self.keys[position]).ratio(), position)
+                  for _, position in overlaps[:self.candidates]]
+        scored.sort(reverse=True)
+        return [(score, self.exact[self.keys[position]]) for score, position in scored[:limit]]
+
+    def match(self, title):
+        """Look up ``title``, returning ``(item, score, problem)``.
+
+        ``score`` is 1 for an exact match and the similarity of the single close
+        enough title otherwise. When there is neither, ``item`` is None and
+        ``problem`` says why.
+        """
+        item = self.exact.get(normalize_string(title))
+        if item is not None:
+            return item, 1.0, None
+
+        matches = self.search(title) if self.threshold < 1 else []
+        if not matches or matches[0][0] < self.threshold:
+            return None, None, 'not found'
+        if len(matches) > 1 and matches[0][0] - matches[1][0] < self.margin:
+            candidates = ', '.join(f'"{item["title"]}" ({score:.2f})' for score, item in matches
+                                   if score >= self.threshold)
+            return None, None, f'not found and ambiguous: {candidates}'
+        score, item = matches[0]
+        return item, score, None
+
+    def get(self, title):
+        """Return the item titled ``title``, or with ``apply_fuzzy`` its close match, logging what was done."""
+        item, score, problem = self.match(title)
+        if problem:
+            logger.error(f'{self.kind} "{title}" {problem}.')
+            return None
+        if score < 1:
+            if not self.apply_fuzzy:
+                logger.error(f'{self.kind} "{title}" not found, closest match "{item["title"]}" ({score:.2f}) '
+                             f'is not applied without --apply-fuzzy')
+                return None
+            logger.warning(f'{self.kind} "{title}" not found, using closest match "{item["title"]}" ({score:.2f})')
+        return item
+
+    def describe(self, title):
+        """Say what ``get`` would do with ``title``, for dry-run reports; '' when it is used as is."""
+        item, score, problem = self.match(title)
+        if problem:
+            return problem
+        if score < 1:
+            if not self.apply_fuzzy:
+                return f'not found, closest match "{item["title"]}" ({score:.2f}) not applied without --apply-fuzzy'
+            return f'applies closest match "{item["title"]}" ({score:.2f})'
+        return '' if item['title'] == title else f'applies "{item["title"]}"'
+
+
+class GroupLookup:
+    """Resolve epic, milestone and iteration references of one group.
+
+    Each kind is listed from GitLab at most once per run and indexed by its
+    normalized title (iterations by start date). Titles without an exact match
+    are compared with the closest one scoring at least ``fuzzy_threshold``,
+    which is only used with ``apply_fuzzy``; a threshold of 1 turns fuzzy
+    matching off. When ``cache_path`` is given the listings are also kept
+    on disk and reused for ``ttl`` seconds.
+    """
+
+    def __init__(self, gl, group_id, cache_path=None, ttl=300, fuzzy_threshold=0.85, apply_fuzzy=False):
+        self.group = gl.groups.get(group_id, lazy=True)
+        self.group_id = group_id
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.fuzzy_threshold = fuzzy_threshold
+        self.apply_fuzzy = apply_fuzzy
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, kind):
+        if kind == 'epics':
+            epics = self.group.epics.list(state='opened', get_all=True)
+            return [{'id': e.id, 'iid': e.iid, 'title': e.title} for e in epics]
+        if kind == 'milestones':
+            milestones = self.group.milestones.list(state='active', get_all=True)
+            return [{'id': m.id, 'title': m.title} for m in milestones]
+        iterations = self.group.iterations.list(get_all=True)
+        return [{'id': i.id, 'iid': i.iid, 'start_date': i.attributes['start_date']} for i in iterations]
+
+    def _load_cache(self):
+        """Return the whole cache file, or {} when it is missing or unreadable."""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable lookup cache {self.cache_path} - {e}")
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _read_cache(self, kind):
+        if not self.cache_path:
+            return None
+        entry = self._load_cache().get(str(self.group_id), {}).get(kind)
+        if not isinstance(entry, dict) or 'items' not in entry or time.time() - entry.get('fetched_at', 0) > self.ttl:
+            return None
+        return entry['items']
+
+    def _write_cache(self, kind, items):
+        cache = self._load_cache()
+        cache.setdefault(str(self.group_id), {})[kind] = {'fetched_at': time.time(), 'items': items}
+        # Write then rename so concurrent runs and crashes never leave a partial file
+        temporary = f'{self.cache_path}.{os.getpid()}.{threading.get_ident()}'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(temporary, self.cache_path)
+
+    def _index(self, kind):
+        with self._lock:
+            return self._load_index(kind)
+
+    def _load_index(self, kind):
+        if kind not in self._indexes:
+            items = self._read_cache(kind)
+            if items is None:
+                logger.info(f"Loading {kind} of group {self.group_id}")
+                items = self._fetch(kind)
+                if self.cache_path:
+                    self._write_cache(kind, items)
+            if kind == 'iterations':
+                index = {}
+                for item in items:
+                    index.setdefault(item['start_date'], item)
+            else:
+                index = TitleIndex(items, kind[:-1], threshold=self.fuzzy_threshold, apply_fuzzy=self.apply_fuzzy)
+            self._indexes[kind] = index
+        return self._indexes[kind]
+
+    def epic(self, epic_title):
+        return self._index('epics').get(epic_title)
+
+    def describe(self, kind, title):
+        """Say what resolving the ``kind`` ('epic' or 'milestone') titled ``title`` would use."""
+        return self._index(f'{kind}s').describe(title)
+
+    def add_issue_to_epic(self, epic, issue_id):
+        self.group.epics.get(epic['iid'], lazy=True).issues.create({'issue_id': issue_id})
+
+    def milestone_id(self, milestone_title):
+        milestone = self._index('milestones').get(milestone_title)
+        if milestone is None:
+            return None
+        return milestone['id']
+
+    def iteration_id(self, start_date):
+        iteration = self._index('iterations').get(start_date.strip())
+        if iteration is None:
+            logger.error(f"Iteration with start date {start_date} not found")
+            return None
+        return iteration['iid']
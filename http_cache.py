@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Read-only metadata endpoints worth revalidating instead of downloading again
+CACHEABLE_PATHS = [
+    r'/api/v4/projects/[^/]+',
+    r'/api/v4/groups/[^/]+',
+    r'/api/v4/groups/[^/]+/(epics|milestones|iterations)',
+]
+
+# Headers that describe the encoded body and no longer apply to the stored one
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class ETagCacheAdapter(HTTPAdapter):
+    """HTTPAdapter keeping GET responses of read-only endpoints on disk.
+
+    Cached entries are revalidated with ``If-None-Match``; a 304 answer is
+    replaced by the stored response. Entries younger than ``fresh_for`` seconds
+    are served without contacting the server at all.
+    """
+
+    def __init__(self, cache_dir, fresh_for=0, cacheable_paths=CACHEABLE_PATHS, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        self.fresh_for = fresh_for
+        self.cacheable = [re.compile(path) for path in cacheable_paths]
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, request):
+        # The token is part of the key so users never see each other's responses
+        token = request.headers.get('PRIVATE-TOKEN', '') + request.headers.get('Authorization', '')
+        key = hashlib.sha256(f'{token} {request.url}'.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _is_cacheable(self, request):
+        if request.method != 'GET':
+            return False
+        path = request.path_url.split('?', 1)[0]
+        return any(pattern.fullmatch(path) for pattern in self.cacheable)
+
+    def _load(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, path, response):
+        entry = {
+            'etag': response.headers['ETag'],
+            'stored_at': time.time(),
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii'),
+        }
+        self._write(path, entry)
+
+    def _write(self, path, entry):
+        # Write then rename so concurrent readers never see a partial entry
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temporary, path)
+
+    def _response(self, request, entry):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['body'])
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def send(self, request, **kwargs):
+        if not self._is_cacheable(request):
+            return super().send(request, **kwargs)
+
+        path = self._entry_path(request)
+        entry = self._load(path)
+        if entry is not None:
+            if time.time() - entry['stored_at'] < self.fresh_for:
+                logger.debug(f"Cache hit for {request.url}")
+                return self._response(request, entry)
+            request.headers['If-None-Match'] = entry['etag']
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            logger.debug(f"Not modified: {request.url}")
+            entry['stored_at'] = time.time()
+            self._write(path, entry)
+            return self._response(request, entry)
+        if response.status_code == 200 and 'ETag' in response.headers:
+            self._save(path, response)
+        return response
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pandas as pd
+
+# Columns update_issue never writes back to GitLab
+IGNORED_FIELDS = ['author', 'iteration', 'closed_at']
+
+
+def parse_labels(value):
+    # An empty cell means no labels, not one empty label
+    return [label.strip() for label in value.split(',') if label.strip()]
+
+
+def compute_changes(rows, current):
+    """Work out what update_issue would change for every CSV row without touching GitLab.
+
+    ``rows`` holds the CSV rows and ``current`` the snapshot returned by
+    ``issues_to_dataframe``; both are joined on ``iid``. The comparison rules mirror
+    ``update_issue``. The result is indexed like ``rows`` (rows without a matching
+    issue are left out) and lists the changed plain fields, label additions and
+    removals, epic and milestone moves, plus a ``changed`` flag.
+    """
+    rows = rows.fillna('')
+    rows = rows[rows['iid'] != '']
+    current = current.set_index(current['iid'].astype(int)).add_suffix('_current')
+    merged = rows.assign(_iid=rows['iid'].astype(int)).join(current, on='_iid', how='inner')
+
+    changes = pd.DataFrame({'iid': merged['iid']}, index=merged.index)
+
+    special = IGNORED_FIELDS + ['epic', 'milestone', 'labels']
+    fields = [field for field in rows.columns if field not in special]
+    changed_fields = pd.DataFrame(index=merged.index)
+    for field in fields:
+        incoming = merged[field].astype(str)
+        if f'{field}_current' in merged:
+            existing = merged[f'{field}_current'].map(str)
+        else:
+            existing = pd.Series('', index=merged.index)
+        changed_fields[field] = (existing.str.strip() != incoming.str.strip()) & (incoming != '')
+    names = np.array(fields, dtype=object)
+    masks = changed_fields.to_numpy(dtype=bool).reshape(len(merged), len(fields))
+    changes['changed_fields'] = [list(names[mask]) for mask in masks]
+
+    for field in ['epic', 'milestone']:
+        if field not in rows.columns:
+            changes[f'{field}_from'] = None
+            changes[f'{field}_to'] = None
+            continue
+        moved = merged[field] != merged[f'{field}_current']
+        changes[f'{field}_from'] = merged[f'{field}_current'].where(moved, None)
+        changes[f'{field}_to'] = merged[field].where(moved, None)
+
+    if 'labels' in rows.columns:
+        incoming = merged['labels'].map(lambda value: set(parse_labels(value)))
+        existing = merged['labels_current'].map(lambda value: set(parse_labels(value)))
+        changes['labels_added'] = [sorted(new - old) for new, old in zip(incoming, existing)]
+        changes['labels_removed'] = [sorted(old - new) for new, old in zip(incoming, existing)]
+        labels_changed = incoming != existing
+    else:
+        changes['labels_added'] = [[] for _ in range(len(merged))]
+        changes['labels_removed'] = [[] for _ in range(len(merged))]
+        labels_changed = False
+
+    changes['changed'] = (changed_fields.any(axis=1) | changes['epic_to'].notna() | changes['milestone_to'].notna()
+                          | labels_changed)
+    return changes
+
+
+def format_changes(changes, describe=None):
+    """Render the changed rows of ``compute_changes`` as report lines.
+
+    ``describe(kind, title)``, when given, notes what an epic or milestone title
+    would resolve to, e.g. ``GroupLookup.describe``.
+    """
+    def target(kind, title):
+        note = describe(kind, title) if describe and title else ''
+        return f'"{title}" ({note})' if note else f'"{title}"'
+
+    lines = []
+    for change in changes[changes['changed']].itertuples():
+        parts = []
+        if change.changed_fields:
+            parts.append(', '.join(change.changed_fields))
+        if change.labels_added or change.labels_removed:
+            parts.append('labels ' + ' '.join([f'+{label}' for label in change.labels_added]
+                                              + [f'-{label}' for label in change.labels_removed]))
+        if pd.notna(change.epic_to):
+            parts.append(f'epic "{change.epic_from}" -> {target("epic", change.epic_to)}')
+        if pd.notna(change.milestone_to):
+            parts.append(f'milestone "{change.milestone_from}" -> {target("milestone", change.milestone_to)}')
+        lines.append(f'Issue ID {change.iid}: ' + '; '.join(parts))
+    return lines
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+from datetime import datetime, timezone
+
+# Columns of the CSV written by pull_issues and read back by update_issues
+ISSUE_FIELDNAMES = ['id', 'iid', 'title', 'epic', 'milestone', 'iteration', 'labels', 'author', 'created_at', 'closed_at', 'description', 'state', 'weight']
+
+
+def rest_timestamp(value):
+    """Convert a webhook or GraphQL timestamp to the form the REST API returns, e.g. ``2024-01-01T10:00:00.000Z``."""
+    if not value:
+        return ''
+    if value.endswith(' UTC'):
+        value = value[:-4] + '+00:00'
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+class IssueRecord:
+    """The issue fields this tool reads, built from REST JSON or mapped GraphQL nodes; missing fields are None."""
+
+    __slots__ = ('id', 'iid', 'title', 'description', 'state', 'created_at', 'updated_at', 'closed_at', 'weight',
+                 'epic', 'milestone', 'milestone_id', 'iteration', 'labels', 'assignees', 'author', 'project')
+
+    def __init__(self, id=None, iid=None, title=None, description=None, state=None, created_at=None,
+                 updated_at=None, closed_at=None, weight=None, epic=None, milestone=None, milestone_id=None,
+                 iteration=None, labels=(), assignees=(), author=None, project=None):
+        self.id = id
+        self.iid = iid
+        self.title = title
+        self.description = description
+        self.state = state
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.closed_at = closed_at
+        self.weight = weight
+        self.epic = epic
+        self.milestone = milestone
+        self.milestone_id = milestone_id
+        self.iteration = iteration
+        self.labels = labels
+        self.assignees = assignees
+        self.author = author
+        self.project = project
+
+    @classmethod
+    def from_attributes(cls, attributes):
+        """Build a record from the attributes of an issue as returned by the REST API."""
+        epic = attributes.get('epic')
+        milestone = attributes.get('milestone')
+        iteration = attributes.get('iteration')
+        author = attributes.get('author')
+        references = attributes.get('references')
+        return cls(
+            id=attributes['id'],
+            iid=attributes['iid'],
+            title=attributes['title'],
+            description=attributes.get('description'),
+            state=attributes.get('state'),
+            created_at=attributes.get('created_at'),
+            updated_at=attributes.get('updated_at'),
+            closed_at=attributes.get('closed_at'),
+            weight=attributes.get('weight'),
+            epic=epic['title'] if epic else None,
+            milestone=milestone['title'] if milestone else None,
+            milestone_id=milestone.get('id') if milestone else None,
+            iteration=iteration['start_date'] if iteration else None,
+            labels=attributes.get('labels') or [],
+            assignees=[assignee['username'] for assignee in attributes.get('assignees') or ()],
+            author=author['name'] if author else None,
+            # references.full is "group/project#iid"
+            project=references['full'].rsplit('#', 1)[0] if references else None,
+        )
+
+    def values(self):
+        """Return the CSV values of the record, in ISSUE_FIELDNAMES order."""
+        return (self.id, self.iid, self.title, self.epic or '', self.milestone or '', self.iteration or '',
+                ', '.join(self.labels), self.author, self.created_at, self.closed_at or '', self.description,
+                self.state, self.weight)
+
+    def to_row(self):
+        """Flatten the record into a CSV row."""
+        return dict(zip(ISSUE_FIELDNAMES, self.values()))
+
+
+def records_from_page(page):
+    """Convert a page of issue JSON objects into records."""
+    return [IssueRecord.from_attributes(attributes) for attributes in page]
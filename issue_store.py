@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+from collections import defaultdict
+from itertools import islice
+
+
+class IssueStore:
+    """Local SQLite copy of a project's issues plus the last sync high-water mark."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        # Readers streaming one project's rows must not block another project's sync, nor the reverse
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                project_id TEXT NOT NULL,
+                iid INTEGER NOT NULL,
+                state TEXT,
+                updated_at TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (project_id, iid)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                project_id TEXT PRIMARY KEY,
+                high_water_mark TEXT
+            );
+            CREATE TABLE IF NOT EXISTS milestones (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def high_water_mark(self, project_id):
+        row = self.conn.execute('SELECT high_water_mark FROM sync_state WHERE project_id = ?',
+                                (str(project_id),)).fetchone()
+        return row[0] if row else None
+
+    def set_high_water_mark(self, project_id, updated_at):
+        with self.conn:
+            self.conn.execute('INSERT INTO sync_state (project_id, high_water_mark) VALUES (?, ?) '
+                              'ON CONFLICT(project_id) DO UPDATE SET high_water_mark = excluded.high_water_mark',
+                              (str(project_id), updated_at))
+
+    def upsert(self, project_id, rows, batch_size=100):
+        """Insert or replace issue rows, returning how many were written.
+
+        Rows are committed ``batch_size`` at a time, and a batch's transaction only
+        starts once all its rows are in hand, so the write lock is never held while
+        a streamed listing fetches its next page.
+        """
+        count = 0
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            with self.conn:
+                self.conn.executemany('INSERT OR REPLACE INTO issues (project_id, iid, state, updated_at, data) '
+                                      'VALUES (?, ?, ?, ?, ?)',
+                                      [(str(project_id), int(row['iid']), row['state'], row.get('updated_at'),
+                                        json.dumps(row)) for row in batch])
+            count += len(batch)
+        return count
+
+    def get(self, project_id, iid):
+        row = self.conn.execute('SELECT data FROM issues WHERE project_id = ? AND iid = ?',
+                                (str(project_id), int(iid))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_missing(self, project_id, iids):
+        """Delete stored issues whose iid is not in ``iids``, returning how many were removed."""
+        iids = {int(iid) for iid in iids}
+        stored = [iid for (iid,) in self.conn.execute('SELECT iid FROM issues WHERE project_id = ?', (str(project_id),))]
+        missing = [iid for iid in stored if iid not in iids]
+        with self.conn:
+            self.conn.executemany('DELETE FROM issues WHERE project_id = ? AND iid = ?',
+                                  [(str(project_id), iid) for iid in missing])
+        return len(missing)
+
+    def rename(self, field, old, new):
+        """Replace ``old`` by ``new`` in one field (e.g. epic or milestone) of every stored issue."""
+        renamed = defaultdict(list)
+        for project_id, data in self.conn.execute('SELECT project_id, data FROM issues').fetchall():
+            row = json.loads(data)
+            if row.get(field) == old:
+                row[field] = new
+                renamed[project_id].append(row)
+        return sum(self.upsert(project_id, rows) for project_id, rows in renamed.items())
+
+    def milestone_title(self, milestone_id):
+        row = self.conn.execute('SELECT title FROM milestones WHERE id = ?', (int(milestone_id),)).fetchone()
+        return row[0] if row else None
+
+    def set_milestone(self, milestone_id, title):
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO milestones (id, title) VALUES (?, ?)', (int(milestone_id), title))
+
+    def rows(self, project_id, states=None):
+        """Yield stored issue rows ordered by iid, optionally restricted to some states."""
+        query = 'SELECT data FROM issues WHERE project_id = ?'
+        params = [str(project_id)]
+        if states:
+            query += f" AND state IN ({', '.join('?' for _ in states)})"
+            params += list(states)
+        for (data,) in self.conn.execute(query + ' ORDER BY iid DESC', params):
+            yield json.loads(data)
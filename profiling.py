@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Collapse ids and paths so requests group by endpoint, e.g. GET /projects/:id/issues/:id
+ID_SEGMENTS = re.compile(r'/(projects|groups|issues|epics|milestones|iterations)/[^/]+')
+
+
+def endpoint_name(method, path_url):
+    path = path_url.split('?', 1)[0]
+    if path.startswith('/api/v4/'):
+        path = path[len('/api/v4'):]
+    return method + ' ' + ID_SEGMENTS.sub(r'/\1/:id', path)
+
+
+class Profiler:
+    """Collect API call counts, bytes, latency per endpoint and wall time per phase.
+
+    Installed as a response hook on client sessions like RateLimiter. Phases
+    nest: time spent in an inner phase is not counted in the outer one, so the
+    totals of all phases add up to the instrumented part of a command. Nothing is
+    recorded until ``enabled`` is set.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.perf_counter()
+        self.endpoints = defaultdict(lambda: {'calls': 0, 'errors': 0, 'bytes_sent': 0, 'bytes_received': 0,
+                                              'seconds': 0.0, 'max_seconds': 0.0})
+        self.phases = defaultdict(float)
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def install(self, session):
+        session.hooks['response'].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        if not self.enabled:
+            return
+        request = response.request
+        sent = len(request.body or b'') if not hasattr(request.body, 'read') else 0
+        # Content-Length is the size on the wire, before gzip is undone
+        received = response.headers.get('Content-Length')
+        received = int(received) if received is not None else len(response.content)
+        seconds = response.elapsed.total_seconds()
+
+        with self.lock:
+            stats = self.endpoints[endpoint_name(request.method, request.path_url)]
+            stats['calls'] += 1
+            stats['errors'] += response.status_code >= 400
+            stats['bytes_sent'] += sent
+            stats['bytes_received'] += received
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def _charge(self, entry, now):
+        with self.lock:
+            self.phases[entry[0]] += now - entry[1]
+        entry[1] = now
+
+    @contextmanager
+    def phase(self, name):
+        """Count the wall time of the block towards phase ``name``."""
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        if stack:
+            self._charge(stack[-1], time.perf_counter())
+        stack.append([name, time.perf_counter()])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._charge(stack.pop(), now)
+            if stack:
+                stack[-1][1] = now
+
+    def timed(self, name, iterable):
+        """Yield from ``iterable``, counting the time spent producing each item towards phase ``name``.
+
+        Used for streamed exports, where fetching pages and writing rows interleave.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self):
+        """Return the collected numbers as a JSON-serialisable dict."""
+        with self.lock:
+            endpoints = {name: dict(stats, seconds=round(stats['seconds'], 4),
+                                    max_seconds=round(stats['max_seconds'], 4))
+                         for name, stats in sorted(self.endpoints.items())}
+            phases = {name: round(seconds, 4) for name, seconds in self.phases.items()}
+
+        totals = {key: sum(stats[key] for stats in endpoints.values())
+                  for key in ('calls', 'errors', 'bytes_sent', 'bytes_received')}
+        totals['seconds'] = round(sum(stats['seconds'] for stats in endpoints.values()), 4)
+        report = {
+            'wall_seconds': round(time.perf_counter() - self.started, 4),
+            'api': totals,
+            'endpoints': endpoints,
+            'phases': phases,
+        }
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            report['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return report
+
+
+# Shared by every client session and command of a CLI run
+profiler = Profiler()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+import sqlite3
+from datetime import datetime, timezone
+
+
+class TimeLedger:
+    """Local SQLite record of the spent time log_time has already posted."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS spent_time (
+                date TEXT NOT NULL,
+                project_id TEXT NOT NULL,
+                user TEXT NOT NULL,
+                iid INTEGER NOT NULL,
+                amount TEXT NOT NULL,
+                logged_at TEXT NOT NULL,
+                PRIMARY KEY (date, project_id, user, iid)
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def logged(self, date, project_id):
+        """Return the (user, iid) pairs already logged for a project on a date."""
+        rows = self.conn.execute('SELECT user, iid FROM spent_time WHERE date = ? AND project_id = ?',
+                                 (date, str(project_id)))
+        return set(rows)
+
+    def record(self, date, project_id, user, iid, amount):
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO spent_time (date, project_id, user, iid, amount, logged_at) '
+                              'VALUES (?, ?, ?, ?, ?, ?)',
+                              (date, str(project_id), user, int(iid), amount,
+                               datetime.now(timezone.utc).isoformat()))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Outcomes that need no further work on resume; failed rows are retried
+DONE_STATUSES = {'applied', 'created', 'unchanged'}
+
+
+def row_fingerprint(row):
+    return hashlib.sha1(json.dumps(row, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class UpdateJournal:
+    """Append-only JSONL record of the outcome of every update_issues row.
+
+    Each line names the CSV row by position and a fingerprint of its content, so
+    a resumed run skips rows already applied or found unchanged, but redoes rows
+    edited in the CSV since. Lines are flushed as they are written and a line cut
+    short by a crash is ignored on reading. The file is only opened, and without
+    ``resume`` truncated, once the first outcome is recorded.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.mode = 'a' if resume else 'w'
+        self.file = None
+        self.partial_line = False
+        self.done = {}
+        if resume:
+            if os.path.exists(path):
+                self._read()
+                logger.info(f"Resuming from {path}: {len(self.done)} rows already done")
+            else:
+                logger.warning(f"No journal at {path}, starting from the first row")
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                self.partial_line = not line.endswith('\n')
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry['status'] in DONE_STATUSES:
+                    self.done[entry['row']] = entry['fingerprint']
+                else:
+                    self.done.pop(entry['row'], None)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_done(self, index, row):
+        return self.done.get(index) == row_fingerprint(row)
+
+    def record(self, index, row, status, message=None):
+        entry = {'row': index, 'iid': row['iid'], 'fingerprint': row_fingerprint(row), 'status': status,
+                 'at': datetime.now(timezone.utc).isoformat()}
+        if message:
+            entry['message'] = message
+        if self.file is None:
+            self.file = open(self.path, self.mode, encoding='utf-8')
+            if self.partial_line:
+                self.file.write('\n')
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
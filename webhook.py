@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+import hmac
+import json
+import logging
+import sqlite3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from issue_record import rest_timestamp
+from issue_store import IssueStore
+
+logger = logging.getLogger(__name__)
+
+
+def issue_event_row(store, payload, existing):
+    """Build the stored row of an issue from an issue event, keeping what the event does not carry.
+
+    Issue events have no epic, iteration or author name, so those stay as last
+    synced. The milestone title comes from milestones seen earlier.
+    """
+    attributes = payload['object_attributes']
+    row = dict(existing or {'epic': '', 'iteration': '', 'author': '', 'milestone': ''})
+    labels = payload.get('labels', attributes.get('labels')) or []
+    weight = attributes.get('weight')
+    row.update({
+        'id': attributes['id'],
+        'iid': attributes['iid'],
+        'title': attributes['title'],
+        'labels': ', '.join(label['title'] for label in labels),
+        'created_at': rest_timestamp(attributes['created_at']),
+        'closed_at': rest_timestamp(attributes.get('closed_at')),
+        'description': attributes.get('description') or '',
+        'state': attributes['state'],
+        'weight': weight if weight is not None else '',
+        'updated_at': rest_timestamp(attributes['updated_at']),
+    })
+
+    milestone_id = attributes.get('milestone_id')
+    if milestone_id is None:
+        row['milestone'] = ''
+    else:
+        title = store.milestone_title(milestone_id)
+        if title is not None:
+            row['milestone'] = title
+        elif 'milestone_id' in payload.get('changes', {}):
+            logger.warning(f"Issue {attributes['iid']} moved to unknown milestone {milestone_id}, "
+                           f"keeping '{row['milestone']}' until the next reconcile")
+    return row
+
+
+def apply_event(store, project_id, payload):
+    """Apply one webhook payload to the issue store, returning a short description of what changed."""
+    kind = payload.get('object_kind')
+    attributes = payload.get('object_attributes', {})
+
+    if kind == 'issue':
+        existing = store.get(project_id, attributes['iid'])
+        store.upsert(project_id, [issue_event_row(store, payload, existing)])
+        return f"issue {attributes['iid']} {attributes.get('action', 'updated')}"
+
+    if kind == 'milestone':
+        old_title = store.milestone_title(attributes['id'])
+        store.set_milestone(attributes['id'], attributes['title'])
+        renamed = 0
+        if old_title is not None and old_title != attributes['title']:
+            renamed = store.rename('milestone', old_title, attributes['title'])
+        return f"milestone {attributes['title']} {payload.get('action', 'updated')}, {renamed} issues renamed"
+
+    if kind == 'epic' or (kind == 'work_item' and attributes.get('type') == 'Epic'):
+        title_change = payload.get('changes', {}).get('title')
+        renamed = 0
+        if title_change:
+            renamed = store.rename('epic', title_change['previous'], title_change['current'])
+        return f"epic {attributes.get('title')} updated, {renamed} issues renamed"
+
+    return None
+
+
+def make_handler(store_path, project_ids, secret=None):
+    """Build a request handler applying events of the projects in ``project_ids``.
+
+    ``project_ids`` maps the GitLab project id and path found in payloads to the
+    project id issues are stored under.
+    """
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def reply(self, status, message):
+            body = json.dumps({'message': message}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if secret and not hmac.compare_digest(self.headers.get('X-Gitlab-Token', ''), secret):
+                return self.reply(401, 'invalid token')
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                return self.reply(400, 'invalid JSON')
+            if not isinstance(payload, dict):
+                return self.reply(400, 'malformed payload')
+
+            project = payload.get('project') or {}
+            project_id = project_ids.get(project.get('id')) or project_ids.get(project.get('path_with_namespace'))
+            if project_id is None:
+                return self.reply(404, 'unknown project')
+
+            try:
+                with IssueStore(store_path) as store:
+                    result = apply_event(store, project_id, payload)
+            except sqlite3.OperationalError as e:
+                # Typically the store locked by another writer for longer than the timeout
+                logger.error(f"Webhook: issue store unavailable - {e}")
+                return self.reply(503, 'issue store unavailable')
+            except sqlite3.Error as e:
+                logger.exception(f"Webhook: issue store error - {e}")
+                return self.reply(500, 'issue store error')
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Webhook: malformed {payload.get('object_kind')} event - {e!r}")
+                return self.reply(400, 'malformed payload')
+            if result is None:
+                return self.reply(202, f"ignored {payload.get('object_kind')} event")
+            logger.info(f"Webhook: {result}")
+            self.reply(200, result)
+
+    return WebhookHandler
+
+
+def make_server(host, port, store_path, project_ids, secret=None):
+    return ThreadingHTTPServer((host, port), make_handler(store_path, project_ids, secret))
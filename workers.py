@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Pace worker threads using GitLab's ``RateLimit-*`` and ``Retry-After`` headers.
+
+    Installed as a response hook on the client session, it pushes back the time at
+    which workers may start their next task whenever GitLab reports that the quota
+    is running low or answers with 429.
+    """
+
+    def __init__(self, min_remaining=10, max_backoff=60.0):
+        self.min_remaining = min_remaining
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.resume_at = 0.0
+        self.backoff = 0.0
+
+    def install(self, session):
+        session.hooks['response'].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        headers = response.headers
+        now = time.time()
+        delay = 0.0
+
+        if response.status_code == 429:
+            self.backoff = min(max(self.backoff * 2, 1.0), self.max_backoff)
+            delay = float(headers.get('Retry-After', self.backoff))
+        else:
+            self.backoff = self.backoff / 2 if self.backoff > 0.1 else 0.0
+            remaining = headers.get('RateLimit-Remaining')
+            reset = headers.get('RateLimit-Reset')
+            if remaining is not None and reset is not None and int(remaining) < self.min_remaining:
+                # Spread the requests that are left over the rest of the window
+                delay = max(int(reset) - now, 0) / max(int(remaining), 1)
+
+        if delay > 0:
+            with self.lock:
+                if now + delay > self.resume_at:
+                    logger.warning(f"Rate limit reached, pausing workers for {delay:.1f}s")
+                    self.resume_at = now + delay
+
+    def wait(self):
+        delay = self.resume_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def run_ordered(func, items, workers=1, limiter=None):
+    """Apply ``func`` to every item with up to ``workers`` threads.
+
+    Results are yielded in input order as soon as they are available, so callers
+    can report per-item outcomes exactly as a sequential loop would.
+    """
+    def task(item):
+        if limiter is not None:
+            limiter.wait()
+        return func(item)
+
+    if workers <= 1:
+        for item in items:
+            yield task(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(task, items)
+
+
+def merge_streams(sources, workers=4, errors=None):
+    """Drain several iterables on worker threads, yielding ``(key, item)`` as items arrive.
+
+    ``sources`` maps a key to a callable returning an iterable. A source that
+    raises stops on its own; its exception is stored in ``errors`` under its key
+    while the other sources keep going.
+    """
+    errors = {} if errors is None else errors
+    items = queue.Queue(maxsize=1000)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def pump(key):
+        try:
+            for item in sources[key]():
+                if stop.is_set():
+                    return
+                put((key, item))
+        except Exception as e:
+            logger.error(f"{key} failed - {e}")
+            errors[key] = e
+        finally:
+            put((key, done))
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for key in sources:
+            executor.submit(pump, key)
+        try:
+            remaining = len(sources)
+            while remaining:
+                key, item = items.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield key, item
+        finally:
+            stop.set()